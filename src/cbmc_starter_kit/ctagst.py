@@ -1,10 +1,13 @@
 """Ctags support for locating symbol definitions"""
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import json
 import logging
+import os
 import subprocess
 import sys
+import tempfile
 
 ################################################################
 # This popen method is used to subprocess-out the invocation of ctags.
@@ -41,20 +44,158 @@ def popen(cmd, cwd=None, stdin=None, encoding=None):
 
 ################################################################
 
-def ctags(root, files):
-    """List symbols defined in files under root."""
+def ctags(root, files, jobs=None):
+    """List symbols defined in files under root.
+
+    The files are split into chunks that are tagged by up to jobs ctags
+    processes at once (one per processor by default)."""
+
+    return try_ctags(root, files, jobs) or []
+
+def try_ctags(root, files, jobs=None):
+    """List symbols defined in files under root, or None if ctags failed."""
 
     root = Path(root)
     files = [str(file_) for file_ in files]
-    return (universal_ctags(root, files) or
-            exhuberant_ctags(root, files) or
-            legacy_ctags(root, files) or
-            [])
+    chunks = chunk_files(root, files, jobs or os.cpu_count() or 1)
+    if not chunks:
+        return []
+    for method in [universal_ctags, exhuberant_ctags, legacy_ctags]:
+        tags = parallel_ctags(method, root, chunks)
+        if tags is not None:
+            return tags
+    return None
+
+# Fewer files than this are not worth a ctags process of their own
+MIN_CHUNK_SIZE = 64
+
+def chunk_files(root, files, count):
+    """Split files into at most count chunks of similar total size."""
+
+    count = max(1, min(count, len(files) // MIN_CHUNK_SIZE))
+    if count == 1:
+        return [files] if files else []
+
+    sizes = {}
+    for file_ in files:
+        try:
+            sizes[file_] = os.path.getsize(root/file_)
+        except OSError:
+            sizes[file_] = 0
+
+    # Assign the largest remaining file to the smallest chunk so far
+    chunks = [[] for _ in range(count)]
+    totals = [0] * count
+    for file_ in sorted(files, key=sizes.get, reverse=True):
+        smallest = totals.index(min(totals))
+        chunks[smallest].append(file_)
+        totals[smallest] += sizes[file_]
+    return chunks
+
+def parallel_ctags(method, root, chunks):
+    """Use method to list symbols defined in each chunk of files concurrently.
+
+    Return None if method failed on any chunk."""
+
+    if len(chunks) == 1:
+        return method(root, chunks[0])
+    tags = []
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        for chunk_tags in pool.map(lambda chunk: method(root, chunk), chunks):
+            if chunk_tags is None:
+                return None
+            tags.extend(chunk_tags)
+    return tags
+
+################################################################
+# A persistent symbol index
+#
+# The index is a JSON file that records the tags defined in each file
+# under root, together with the modification time and size of the file
+# when it was tagged:
+#   {"version": 1, "files": {PATH: {"mtime": NS, "size": N, "tags": [...]}}}
+# where PATH is relative to root and each tag is a dict
+# {"symbol": symbol, "line": line, "kind": kind}.  Only files that are
+# new or whose modification time or size has changed are tagged again.
+
+INDEX_VERSION = 1
+
+def indexed_ctags(root, files, index_file):
+    """List symbols defined in files under root using a persistent index."""
+
+    root = Path(root)
+    index = load_index(index_file)
+    stale = index['files']
+    current = {}
+    changed = []
+    for file_ in files:
+        path = os.path.normpath(file_)
+        try:
+            stat = os.stat(root/path)
+        except OSError:
+            logging.debug("Skipping missing file: %s", root/path)
+            continue
+        entry = stale.get(path)
+        if entry and (entry['mtime'], entry['size']) == (stat.st_mtime_ns, stat.st_size):
+            current[path] = entry
+            continue
+        current[path] = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'tags': []}
+        changed.append(path)
+
+    logging.info("Tagging %d of %d files", len(changed), len(current))
+    tags = try_ctags(root, changed) if changed else []
+    if tags is None:
+        # Do not record the changed files as free of symbols if ctags failed
+        logging.info("Could not tag %d files", len(changed))
+        for path in changed:
+            del current[path]
+        tags = []
+    for tag in tags:
+        path = os.path.normpath(os.path.relpath(tag['file'], root))
+        if path in current:
+            current[path]['tags'].append(
+                {'symbol': tag['symbol'], 'line': tag['line'], 'kind': tag['kind']})
+    if current != stale:
+        save_index(index_file, {'version': INDEX_VERSION, 'files': current})
+
+    return [{'symbol': tag['symbol'], 'file': root/path, 'line': tag['line'],
+             'kind': tag['kind']}
+            for path, entry in current.items() for tag in entry['tags']]
+
+def load_index(index_file):
+    """Load the symbol index in index_file, or an empty index."""
+
+    try:
+        with open(index_file, encoding='utf-8') as handle:
+            index = json.load(handle)
+        if index.get('version') == INDEX_VERSION:
+            return index
+        logging.info("Discarding symbol index with old version: %s", index_file)
+    except FileNotFoundError:
+        pass
+    except (OSError, AttributeError, json.decoder.JSONDecodeError) as error:
+        logging.info("Discarding unreadable symbol index: %s: %s", index_file, error)
+    return {'version': INDEX_VERSION, 'files': {}}
+
+def save_index(index_file, index):
+    """Write the symbol index to index_file atomically."""
+
+    index_dir = os.path.dirname(os.path.abspath(index_file))
+    try:
+        os.makedirs(index_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+                'w', encoding='utf-8', dir=index_dir, delete=False) as handle:
+            json.dump(index, handle)
+        os.replace(handle.name, index_file)
+    except OSError as error:
+        logging.info("Could not write symbol index: %s: %s", index_file, error)
 
 ################################################################
 
 def universal_ctags(root, files):
-    """Use universal ctags to list symbols defined in files under root."""
+    """Use universal ctags to list symbols defined in files under root.
+
+    Return None if universal ctags failed."""
 
     # See universal ctags man page at https://docs.ctags.io/en/latest/man/ctags.1.html
     cmd = [
@@ -70,7 +211,7 @@ def universal_ctags(root, files):
         strings = stdout.splitlines()
     except UserWarning:
         logging.info("Universal ctags failed")
-        strings = []
+        return None
 
     return [tag for string in strings for tag in universal_tag(root, string)]
 
@@ -91,7 +232,9 @@ def universal_tag(root, string):
 ################################################################
 
 def exhuberant_ctags(root, files):
-    """Use exhuberant ctags to list symbols defined in files under root."""
+    """Use exhuberant ctags to list symbols defined in files under root.
+
+    Return None if exhuberant ctags failed."""
 
     # See exhuberant ctags man page at https://linux.die.net/man/1/ctags
     cmd = [
@@ -107,7 +250,7 @@ def exhuberant_ctags(root, files):
         strings = stdout.splitlines()
     except UserWarning:
         logging.info("Exhuberant ctags failed")
-        strings = []
+        return None
 
     return [tag for string in strings for tag in exhuberant_tag(root, string)]
 
@@ -127,7 +270,9 @@ def exhuberant_tag(root, string):
 ################################################################
 
 def legacy_ctags(root, files):
-    """Use legacy ctags to list symbols defined in files under root."""
+    """Use legacy ctags to list symbols defined in files under root.
+
+    Return None if legacy ctags failed."""
 
     # MacOS ships with a legacy ctags from BSD installed in /usr/bin/ctags.
     # See the MacOS man page for the documentation used to implement this method.
@@ -141,7 +286,7 @@ def legacy_ctags(root, files):
         strings = stdout.splitlines()
     except UserWarning:
         logging.info("Legacy ctags failed")
-        strings = []
+        return None
     return [tag for string in strings for tag in legacy_tag(root, string)]
 
 def legacy_tag(root, string):
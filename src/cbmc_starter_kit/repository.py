@@ -5,6 +5,7 @@
 
 from pathlib import Path
 from subprocess import Popen, PIPE
+import fnmatch
 import logging
 
 import git
@@ -122,22 +123,73 @@ def run(cmd, cwd=None, stdin=None):
         logging.debug("FileNotFoundError: command '%s'", ' '.join(cmd))
         return None, None
 
-def function_tags(repo='.'):
+def symbol_index_file(repo='.'):
+    """Path to the ctags symbol index for the repository, or None.
+
+    The index is kept in the git directory, so that it is private to
+    the working tree and is never committed."""
+
+    try:
+        git_dir = git.Repo(repo).git_dir
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError):
+        return None
+    return Path(git_dir) / "cbmc-starter-kit" / "symbol-index.json"
+
+# Source files are enumerated from the git index.  The index lists
+# the files tracked in the repository, but not build products, Litani
+# output, goto binaries, or the content of submodules (a submodule
+# appears in the index as a single entry of type gitlink).
+
+SOURCE_INCLUDE = ['*.c']
+SOURCE_EXCLUDE = []
+
+# The mode git uses for a submodule in the index
+GITLINK_MODE = 0o160000
+
+def source_files(repo='.', include=None, exclude=None):
+    """List of source files in the repository matching the globs.
+
+    Paths are relative to the root of the repository.  A file is listed
+    if it matches a glob in include and no glob in exclude.  Globs are
+    matched against the whole relative path, and '*' matches '/'.
+    Submodules are not searched.  If repo is not a git repository, the
+    file system is searched instead."""
+
+    include = include or SOURCE_INCLUDE
+    exclude = exclude or SOURCE_EXCLUDE
+
+    try:
+        entries = git.Repo(repo).index.entries.values()
+        paths = {entry.path for entry in entries if entry.mode != GITLINK_MODE}
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError):
+        logging.debug("No git index for %s: searching the file system", repo)
+        paths = {str(path.relative_to(repo)) for path in Path(repo).rglob('*')
+                 if path.is_file()}
+
+    return sorted(path for path in paths
+                  if any(fnmatch.fnmatchcase(path, glob) for glob in include)
+                  and not any(fnmatch.fnmatchcase(path, glob) for glob in exclude))
+
+def function_tags(repo='.', include=None, exclude=None):
     """List of tags for function definitions in respository source files.
 
     Each tag is a dict '{"name": function, "path": source}' naming a
-    function and a source file defining the function."""
+    function and a source file defining the function.  The source files
+    are the files selected by source_files(repo, include, exclude).
+    The tags are read from a symbol index that is updated by tagging
+    only the source files that have changed since the index was last
+    written."""
 
     repo = Path(repo).resolve()
-
-    find_cmd = ['find', '.', '-name', '*.c']
-    files, _ = run(find_cmd, cwd=repo)
-    if files is None: # run() logs errors on debug
-        return []
+    files = source_files(repo, include, exclude)
 
     # legacy ctags does not give the kind of a symbol
     # assume a symbol is a function if the kind is None
-    tags = ctagst.ctags(repo, files.split())
+    index_file = symbol_index_file(repo)
+    if index_file is None:
+        tags = ctagst.ctags(repo, files)
+    else:
+        tags = ctagst.indexed_ctags(repo, files, index_file)
     return [tag for tag in tags if tag['kind'] in ['function', None]]
 
 def function_paths(func, tags):
@@ -145,7 +197,7 @@ def function_paths(func, tags):
 
     return sorted([tag['file'] for tag in tags if tag['symbol'] == func])
 
-def function_sources(func, cwd='.', repo='.'):
+def function_sources(func, cwd='.', repo='.', include=None, exclude=None):
     """Paths to all source files in the repository defining a function func.
 
     Paths are absolute if abspath is True, and relative to cwd otherwise.
@@ -155,7 +207,7 @@ def function_sources(func, cwd='.', repo='.'):
     cwd = Path(cwd).resolve()
     repo = Path(repo).resolve()
 
-    tags = function_tags(repo)
+    tags = function_tags(repo, include, exclude)
     sources = function_paths(func, tags)
 
     assert all(src.is_file() for src in sources)
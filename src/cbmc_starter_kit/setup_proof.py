@@ -5,7 +5,10 @@
 
 """Set up a CBMC proof."""
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import json
+import logging
 import os
 import shutil
 
@@ -16,8 +19,56 @@ from cbmc_starter_kit import util
 ################################################################
 
 def parse_arguments():
-    desc = "Set up CBMC proof infrastructure for a proof."
-    options = []
+    desc = """
+    Set up CBMC proof infrastructure for a proof.  With --functions or
+    --source-files, set up the proofs of many functions at once without
+    asking any questions."""
+    options = [{
+        'flag': '--include',
+        'metavar': 'GLOB',
+        'nargs': '+',
+        'help': f"""
+                Search for the function in the source files in the git index
+                whose paths relative to the repository root match GLOB
+                ('*' matches '/'). default: {' '.join(repository.SOURCE_INCLUDE)}"""
+        }, {
+        'flag': '--exclude',
+        'metavar': 'GLOB',
+        'nargs': '+',
+        'help': """
+                Do not search for the function in the source files whose paths
+                relative to the repository root match GLOB."""
+        }, {
+        'flag': '--functions',
+        'metavar': 'FILE',
+        'help': """
+                Set up a proof for each function listed in FILE (one function
+                per line, ignoring blank lines and lines starting with '#')
+                without asking any questions."""
+        }, {
+        'flag': '--source-files',
+        'metavar': 'SOURCE',
+        'nargs': '+',
+        'help': """
+                Set up a proof for each function defined in a SOURCE file
+                without asking any questions."""
+        }, {
+        'flag': '--report',
+        'metavar': 'FILE',
+        'default': 'setup-proof-report.json',
+        'help': """
+                With --functions or --source-files, write to FILE the functions
+                for which no proof was set up because no source file or more
+                than one source file defines them, or because the proof
+                directory exists. default: %(default)s"""
+        }, {
+        'flag': '--jobs',
+        'metavar': 'N',
+        'type': int,
+        'help': """
+                With --functions or --source-files, set up at most N proofs
+                at once. default: one per processor"""
+        }]
     args = arguments.create_parser(
         options=options,
         description=desc).parse_args()
@@ -60,29 +111,100 @@ def patch_path_to_source_file(lines, source_file, source_root):
 
 ################################################################
 
-def main():
-    """Set up CBMC proof."""
-
-    parse_arguments() # only arguments are --verbose and --debug
-
-    function = util.ask_for_function_name()
-    source_file = util.ask_for_source_file(function)
-    source_root = repository.repository_root()
-    proof_root = repository.proofs_root()
+def read_proof_templates():
+    return {path.name: read_proof_template(path) for path in proof_template_filenames()}
 
+def render_proof(function, source_file, templates, proof_root, source_root):
+    """Create the proof directory for function from the proof templates."""
 
     proof_dir = Path(function)
     proof_dir.mkdir()
 
-    for filename in proof_template_filenames():
-        lines = read_proof_template(filename)
+    for filename, lines in templates.items():
         lines = patch_function_name(lines, function)
         lines = patch_path_to_makefile(lines, proof_root, proof_dir)
         lines = patch_path_to_proof_root(lines, proof_root, source_root)
         lines = patch_path_to_source_file(lines, source_file, source_root)
-        write_proof_template(lines, filename.name, proof_dir)
+        write_proof_template(lines, filename, proof_dir)
 
     rename_proof_harness(function, proof_dir)
 
+################################################################
+# Set up many proofs at once
+#
+# The repository is tagged once for all functions, and a proof is set
+# up for each function defined in exactly one source file.  Everything
+# else goes to the report file instead of being asked about.
+
+def read_function_list(path):
+    with open(path, encoding='utf-8') as data:
+        lines = [line.strip() for line in data.read().splitlines()]
+    return [line for line in lines if line and not line.startswith('#')]
+
+def batch_sources(args, tags):
+    """Map each function to the list of source files defining it."""
+
+    sources = {}
+    if args.functions:
+        for function in read_function_list(args.functions):
+            sources[function] = repository.function_paths(function, tags)
+    if args.source_files:
+        files = {Path(src).resolve() for src in args.source_files}
+        for tag in tags:
+            if Path(tag['file']).resolve() in files:
+                sources.setdefault(tag['symbol'], [])
+                if tag['file'] not in sources[tag['symbol']]:
+                    sources[tag['symbol']].append(tag['file'])
+    return sources
+
+def batch_main(args):
+    """Set up CBMC proofs for many functions without asking questions."""
+
+    source_root = repository.repository_root()
+    proof_root = repository.proofs_root()
+
+    tags = repository.function_tags(source_root, args.include, args.exclude)
+    sources = batch_sources(args, tags)
+    report = {
+        'undefined': sorted(func for func, srcs in sources.items() if not srcs),
+        'ambiguous': {func: sorted(str(src) for src in srcs)
+                      for func, srcs in sorted(sources.items()) if len(srcs) > 1},
+        'existing': sorted(func for func, srcs in sources.items()
+                           if len(srcs) == 1 and Path(func).exists()),
+    }
+    proofs = {func: srcs[0] for func, srcs in sorted(sources.items())
+              if len(srcs) == 1 and not Path(func).exists()}
+
+    templates = read_proof_templates()
+    with ThreadPoolExecutor(max_workers=args.jobs or os.cpu_count()) as pool:
+        futures = [pool.submit(render_proof, func, src, templates, proof_root, source_root)
+                   for func, src in proofs.items()]
+        for future in futures:
+            future.result()
+
+    with open(args.report, "w", encoding='utf-8') as data:
+        json.dump(report, data, indent=2)
+    logging.info("Set up %d proofs", len(proofs))
+    skipped = len(report['undefined']) + len(report['ambiguous']) + len(report['existing'])
+    if skipped:
+        logging.warning("Did not set up %d proofs: see %s", skipped, args.report)
+
+def main():
+    """Set up CBMC proof."""
+
+    args = parse_arguments()
+
+    if args.functions or args.source_files:
+        batch_main(args)
+        return
+
+    function = util.ask_for_function_name()
+    source_file = util.ask_for_source_file(
+        function, include=args.include, exclude=args.exclude)
+    source_root = repository.repository_root()
+    proof_root = repository.proofs_root()
+
+    render_proof(function, source_file, read_proof_templates(), proof_root, source_root)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,672 @@
+#!/usr/bin/env python3
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import argparse
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+
+
+DESCRIPTION = """Run a command through a local content-addressed cache of
+its outputs."""
+
+# Keep the epilog hard-wrapped at 70 characters, as it gets printed
+# verbatim in the terminal. 70 characters stops here --------------> |
+EPILOG = """
+The cache key of a command is a hash of the contents of its input
+files, the command line itself, and the version of the tool that the
+command runs.  If an entry with the same key is in the cache, the
+outputs of the command are restored from the cache and the command is
+not run.  Otherwise the command is run and its outputs are added to
+the cache.  When the cache grows beyond its maximum size, the least
+recently used entries are evicted.
+
+The compile subcommand runs a goto-cc command compiling several source
+files by compiling each source file separately into a goto object and
+linking the objects.  The cache key of a goto object is a hash of the
+preprocessed text of its source file, the flags of the command, and
+the version of goto-cc, so proofs compiling the same source file with
+the same flags share the goto object.
+
+The crangle subcommand runs a crangler command.  The cache key of the
+source file crangler writes is a hash of the crangler configuration
+(except for the name of the output file), the preprocessed text of the
+source file, and the version of crangler, so proofs rewriting the same
+source file in the same way share the rewritten source file.
+
+Makefile.common runs the jobs that build and check the goto binaries
+and rewrite source files through this script when the build cache,
+the result cache, or the object store is enabled.
+"""
+# 70 characters stops here ----------------------------------------> |
+
+# Bump this value to invalidate all cache entries written by older
+# versions of this script.
+_CACHE_FORMAT = "1"
+
+_ENTRIES = "entries"
+_TMP = "tmp"
+_TOOL_VERSIONS = "tool-versions.json"
+_LOCK = "lock"
+_ENTRY_FILE = "entry.json"
+_STDOUT_FILE = "stdout"
+
+# Evict entries until the cache is this fraction of its maximum size,
+# so that we do not evict on every single store
+_LOW_WATER_MARK = 0.8
+
+_SIZE_SUFFIXES = {
+    "": 1,
+    "K": 1024,
+    "M": 1024 ** 2,
+    "G": 1024 ** 3,
+    "T": 1024 ** 4,
+}
+
+
+def get_args():
+    pars = argparse.ArgumentParser(
+        description=DESCRIPTION, epilog=EPILOG,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    subs = pars.add_subparsers(dest="subcommand", required=True)
+
+    run_parser = subs.add_parser(
+        "run", help="run a command, restoring its outputs from the cache")
+    compile_ = subs.add_parser(
+        "compile", help=(
+            "compile each source file of a goto-cc command separately, "
+            "restoring the goto objects from the cache, and link them"))
+    crangle = subs.add_parser(
+        "crangle", help=(
+            "run crangler, restoring the rewritten source file from the "
+            "cache"))
+
+    for sub in [run_parser, compile_, crangle]:
+        for arg in [{
+                "flags": ["--cache-dir"],
+                "metavar": "DIR",
+                "required": True,
+                "type": pathlib.Path,
+                "help": "root of the cache",
+        }, {
+                "flags": ["--max-size"],
+                "metavar": "SIZE",
+                "default": "20G",
+                "type": parse_size,
+                "help": (
+                    "evict least recently used entries when the cache grows "
+                    "beyond SIZE bytes (suffixes K, M, G, T). Default: "
+                    "%(default)s"),
+        }]:
+            flags = arg.pop("flags")
+            sub.add_argument(*flags, **arg)
+
+    for arg in [{
+            "flags": ["--inputs"],
+            "metavar": "FILE",
+            "nargs": "*",
+            "default": [],
+            "help": "files read by the command",
+    }, {
+            "flags": ["--outputs"],
+            "metavar": "FILE",
+            "nargs": "*",
+            "default": [],
+            "help": "files written by the command",
+    }, {
+            "flags": ["--relocatable"],
+            "action": "store_true",
+            "help": (
+                "the paths of the input files do not affect the outputs, "
+                "only their contents do, so commands run on identical "
+                "inputs in different directories share a cache entry"),
+    }, {
+            "flags": ["--preprocess"],
+            "action": "store_true",
+            "help": (
+                "the command compiles the C source files among its inputs: "
+                "include the preprocessed text of each source file in the "
+                "key, so the key changes when an included header changes"),
+    }, {
+            "flags": ["--stdout"],
+            "action": "store_true",
+            "help": "the standard output of the command is an output, too",
+    }, {
+            "flags": ["--cacheable-returns"],
+            "metavar": "RC",
+            "nargs": "+",
+            "type": int,
+            "default": [0],
+            "help": (
+                "cache the outputs of the command only if it returns one of "
+                "these return codes. Default: %(default)s"),
+    }, {
+            "flags": ["--tools"],
+            "metavar": "TOOL",
+            "nargs": "+",
+            "default": [],
+            "help": (
+                "include the version of TOOL in the key, in addition to the "
+                "version of the tool run by the command"),
+    }]:
+        flags = arg.pop("flags")
+        run_parser.add_argument(*flags, **arg)
+
+    for arg in [{
+            "flags": ["--sources"],
+            "metavar": "FILE",
+            "nargs": "+",
+            "required": True,
+            "help": "the source files compiled by the goto-cc command",
+    }, {
+            "flags": ["--output"],
+            "metavar": "FILE",
+            "required": True,
+            "help": "the goto binary written by the goto-cc command",
+    }]:
+        flags = arg.pop("flags")
+        compile_.add_argument(*flags, **arg)
+
+    for arg in [{
+            "flags": ["--config"],
+            "metavar": "FILE",
+            "required": True,
+            "help": "the crangler configuration file used by the command",
+    }, {
+            "flags": ["--preprocessor"],
+            "metavar": "CC",
+            "default": "goto-cc",
+            "help": (
+                "the compiler used to preprocess the source file for the "
+                "key. Default: %(default)s"),
+    }]:
+        flags = arg.pop("flags")
+        crangle.add_argument(*flags, **arg)
+
+    for sub in [run_parser, compile_, crangle]:
+        sub.add_argument(
+            "command", metavar="-- COMMAND", nargs=argparse.REMAINDER,
+            help="the command to run")
+        sub.add_argument("--verbose", action="store_true", help="verbose output")
+
+    args = pars.parse_args()
+    if args.command and args.command[0] == "--":
+        args.command = args.command[1:]
+    if not args.command:
+        pars.error("no command given")
+    return args
+
+
+def parse_size(string):
+    string = string.strip().upper().rstrip("B")
+    suffix = string[-1:] if string[-1:] in _SIZE_SUFFIXES else ""
+    try:
+        return int(float(string[:len(string) - len(suffix)]) * _SIZE_SUFFIXES[suffix])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: '{string}'") from None
+
+
+################################################################
+# Cache keys
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _tool_version(cache_dir, tool):
+    """The output of `tool --version`, memoized on the tool binary."""
+
+    path = shutil.which(tool)
+    if path is None:
+        return None
+    stat = pathlib.Path(path).resolve().stat()
+    memo_key = f"{path}:{stat.st_mtime_ns}:{stat.st_size}"
+
+    memo_file = cache_dir / _TOOL_VERSIONS
+    try:
+        with open(memo_file, encoding="utf-8") as handle:
+            memo = json.load(handle)
+    except (OSError, ValueError):
+        memo = {}
+    if memo_key in memo:
+        return memo[memo_key]
+
+    proc = subprocess.run(
+        [path, "--version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        universal_newlines=True, check=False)
+    version = proc.stdout.strip() if not proc.returncode else None
+
+    memo[memo_key] = version
+    _atomic_write_json(memo_file, memo, cache_dir)
+    return version
+
+
+def _compiler_flags(command, inputs, outputs):
+    """The compiler in command with its flags, without inputs and outputs."""
+
+    dropped = set(inputs) | set(outputs)
+    cmd = []
+    words = iter(command)
+    for word in words:
+        if word == "-o":
+            next(words, None)
+            continue
+        if word not in dropped:
+            cmd.append(word)
+    return cmd
+
+
+def _preprocessed_digest(command, inputs, outputs, source):
+    """Digest of the output of the compiler in command run with -E on source."""
+
+    cmd = [*_compiler_flags(command, inputs, outputs), "-E", source]
+
+    proc = subprocess.run(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False)
+    if proc.returncode:
+        return None
+    return hashlib.sha256(proc.stdout).hexdigest()
+
+
+def compute_key(args):
+    """The cache key for the command described by args, or None."""
+
+    inputs = list(args.inputs)
+    outputs = list(args.outputs)
+
+    placeholders = {out: f"<output-{idx}>" for idx, out in enumerate(outputs)}
+    if args.relocatable:
+        placeholders.update(
+            {inp: f"<input-{idx}>" for idx, inp in enumerate(inputs)})
+
+    key = {
+        "format": _CACHE_FORMAT,
+        "command": [placeholders.get(word, word) for word in args.command],
+        "stdout": args.stdout,
+        "inputs": [],
+        "tools": {},
+    }
+
+    for tool in [args.command[0], *args.tools]:
+        key["tools"][tool] = _tool_version(args.cache_dir, tool)
+
+    for idx, inp in enumerate(inputs):
+        name = f"<input-{idx}>" if args.relocatable else inp
+        try:
+            entry = [name, _file_digest(inp)]
+        except OSError as error:
+            logging.warning("not caching: could not read input %s: %s", inp, error)
+            return None
+        if args.preprocess and inp.endswith(".c"):
+            preprocessed = _preprocessed_digest(args.command, inputs, outputs, inp)
+            if preprocessed is None:
+                logging.warning("not caching: could not preprocess %s", inp)
+                return None
+            entry.append(preprocessed)
+        key["inputs"].append(entry)
+
+    blob = json.dumps(key, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+################################################################
+# Cache entries
+
+
+def _entry_dir(cache_dir, key):
+    return cache_dir / _ENTRIES / key[:2] / key
+
+
+def _lock_file(cache_dir, key):
+    return _entry_dir(cache_dir, key).with_suffix(".lock")
+
+
+@contextlib.contextmanager
+def _key_lock(cache_dir, key):
+    """Serialize jobs with the same key.
+
+    Jobs with identical inputs (for example, the CBMC jobs of two proofs
+    that build identical goto binaries) run the command only once: the
+    first job to take the lock runs the command, and the others wait for
+    it and then restore its outputs from the cache.
+    """
+
+    if key is None:
+        yield
+        return
+    lock_file = _lock_file(cache_dir, key)
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_file, "w", encoding="utf-8") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def _atomic_write_json(path, data, cache_dir):
+    tmp_dir = cache_dir / _TMP
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+            "w", dir=tmp_dir, delete=False, encoding="utf-8") as handle:
+        json.dump(data, handle, indent=2)
+    os.replace(handle.name, path)
+
+
+def restore(cache_dir, key, outputs, stdout):
+    """Restore the outputs of the entry for key, return its return code.
+
+    Return None if there is no entry for key.
+    """
+
+    entry = _entry_dir(cache_dir, key)
+    try:
+        with open(entry / _ENTRY_FILE, encoding="utf-8") as handle:
+            meta = json.load(handle)
+        if len(meta["outputs"]) != len(outputs):
+            return None
+        for idx, out in enumerate(outputs):
+            pathlib.Path(out).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(entry / str(idx), out)
+        if stdout:
+            with open(entry / _STDOUT_FILE, "rb") as handle:
+                shutil.copyfileobj(handle, sys.stdout.buffer)
+            sys.stdout.flush()
+        # The modification time of the entry file records the last use
+        os.utime(entry / _ENTRY_FILE)
+    except (OSError, ValueError, KeyError):
+        return None
+    return meta["returncode"]
+
+
+def store(cache_dir, key, outputs, stdout_file, returncode):
+    tmp_dir = cache_dir / _TMP
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    staging = pathlib.Path(tempfile.mkdtemp(dir=tmp_dir))
+    try:
+        for idx, out in enumerate(outputs):
+            shutil.copyfile(out, staging / str(idx))
+        if stdout_file is not None:
+            shutil.copyfile(stdout_file, staging / _STDOUT_FILE)
+        with open(staging / _ENTRY_FILE, "w", encoding="utf-8") as handle:
+            json.dump({
+                "returncode": returncode,
+                "outputs": [str(out) for out in outputs],
+            }, handle, indent=2)
+
+        entry = _entry_dir(cache_dir, key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        # Another job may have stored the same entry in the meantime
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            pass
+    except OSError as error:
+        logging.warning("could not add entry to cache: %s", error)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _entry_size(entry):
+    return sum(
+        fyle.stat().st_size for fyle in entry.iterdir() if fyle.is_file())
+
+
+def evict(cache_dir, max_size):
+    """Evict least recently used entries if the cache is larger than max_size."""
+
+    with open(cache_dir / _LOCK, "w", encoding="utf-8") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # Another job is already evicting entries
+            return
+
+        entries = []
+        for entry in (cache_dir / _ENTRIES).glob("*/*"):
+            if not entry.is_dir():
+                continue
+            try:
+                last_use = (entry / _ENTRY_FILE).stat().st_mtime
+                entries.append((last_use, _entry_size(entry), entry))
+            except OSError:
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        if total <= max_size:
+            return
+
+        for _, size, entry in sorted(entries, key=lambda entry: entry[0]):
+            if total <= max_size * _LOW_WATER_MARK:
+                break
+            logging.debug("evicting %s", entry)
+            shutil.rmtree(entry, ignore_errors=True)
+            with contextlib.suppress(OSError):
+                entry.with_suffix(".lock").unlink()
+            total -= size
+
+
+################################################################
+
+
+def _run_command(command, stdout_file):
+    with open(stdout_file, "wb") if stdout_file else contextlib.nullcontext() as handle:
+        with subprocess.Popen(command, stdout=handle) as proc:
+
+            def forward(signum, _frame):
+                proc.send_signal(signum)
+            for signum in [signal.SIGTERM, signal.SIGINT]:
+                signal.signal(signum, forward)
+
+            return proc.wait()
+
+
+def run(args):
+    args.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    key = compute_key(args)
+    with _key_lock(args.cache_dir, key):
+        if key is not None:
+            returncode = restore(args.cache_dir, key, args.outputs, args.stdout)
+            if returncode is not None:
+                print(
+                    f"cache.py: outputs restored from cache entry {key}; "
+                    f"did not run '{' '.join(args.command)}'", file=sys.stderr)
+                return returncode
+
+        returncode, stored = _run_and_store(args, key)
+
+    if stored:
+        evict(args.cache_dir, args.max_size)
+    return returncode
+
+
+def _run_and_store(args, key):
+    stdout_file = None
+    if args.stdout:
+        tmp_dir = args.cache_dir / _TMP
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        handle, stdout_file = tempfile.mkstemp(dir=tmp_dir)
+        os.close(handle)
+
+    try:
+        returncode = _run_command(args.command, stdout_file)
+        if stdout_file:
+            with open(stdout_file, "rb") as handle:
+                shutil.copyfileobj(handle, sys.stdout.buffer)
+            sys.stdout.flush()
+
+        stored = key is not None and returncode in args.cacheable_returns
+        if stored:
+            store(args.cache_dir, key, args.outputs, stdout_file, returncode)
+    finally:
+        if stdout_file:
+            pathlib.Path(stdout_file).unlink()
+
+    return returncode, stored
+
+
+################################################################
+# Goto objects
+
+
+def object_key(cache_dir, flags, source, preprocessed):
+    """The cache key for the goto object compiled from source."""
+
+    key = {
+        "format": _CACHE_FORMAT,
+        "object": True,
+        "flags": flags,
+        "source": source,
+        "preprocessed": preprocessed,
+        "tools": {flags[0]: _tool_version(cache_dir, flags[0])},
+    }
+    blob = json.dumps(key, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _compile_object(args, flags, source, obj):
+    """Compile source into the goto object obj through the cache.
+
+    Return the return code of the compiler and whether the object was
+    restored from the cache.
+    """
+
+    preprocessed = _preprocessed_digest(
+        args.command, args.sources, [args.output], source)
+    if preprocessed is None:
+        logging.warning("not caching: could not preprocess %s", source)
+        key = None
+    else:
+        key = object_key(args.cache_dir, flags, source, preprocessed)
+
+    with _key_lock(args.cache_dir, key):
+        if key is not None and restore(args.cache_dir, key, [obj], False) == 0:
+            logging.debug("goto object for %s restored from %s", source, key)
+            return 0, True
+        returncode = _run_command([*flags, "-c", source, "-o", obj], None)
+        if key is not None and not returncode:
+            store(args.cache_dir, key, [obj], None, returncode)
+        return returncode, False
+
+
+def compile_objects(args):
+    args.cache_dir.mkdir(parents=True, exist_ok=True)
+    flags = _compiler_flags(args.command, args.sources, [args.output])
+
+    tmp_dir = args.cache_dir / _TMP
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    obj_dir = pathlib.Path(tempfile.mkdtemp(dir=tmp_dir))
+    restored = 0
+    try:
+        objects = []
+        for idx, source in enumerate(args.sources):
+            obj = str(obj_dir / f"{idx}.o")
+            returncode, hit = _compile_object(args, flags, source, obj)
+            if returncode:
+                return returncode
+            restored += hit
+            objects.append(obj)
+
+        print(
+            f"cache.py: restored {restored} of {len(objects)} "
+            "goto objects from the cache", file=sys.stderr)
+        returncode = _run_command([*flags, *objects, "-o", args.output], None)
+    finally:
+        shutil.rmtree(obj_dir, ignore_errors=True)
+
+    if restored < len(args.sources):
+        evict(args.cache_dir, args.max_size)
+    return returncode
+
+
+################################################################
+# Rewritten source files
+
+
+def crangler_key(cache_dir, config, crangler, preprocessor):
+    """The cache key for the output of crangler run with config, or None."""
+
+    sources = config.get("sources", [])
+    cmd = [
+        preprocessor,
+        *[f"-I{path}" for path in config.get("includes", [])],
+        *[f"-D{define}" for define in config.get("defines", [])],
+    ]
+    preprocessed = []
+    for source in sources:
+        digest = _preprocessed_digest(cmd, [], [], source)
+        if digest is None:
+            logging.warning("not caching: could not preprocess %s", source)
+            return None
+        preprocessed.append(digest)
+
+    key = {
+        "format": _CACHE_FORMAT,
+        "crangle": True,
+        "config": {
+            name: value for name, value in config.items() if name != "output"},
+        "preprocessed": preprocessed,
+        "tools": {crangler: _tool_version(cache_dir, crangler)},
+    }
+    blob = json.dumps(key, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def crangle_source(args):
+    args.cache_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(args.config, encoding="utf-8") as handle:
+            config = json.load(handle)
+        output = config["output"]
+    except (OSError, ValueError, KeyError) as error:
+        logging.warning("not caching: could not load %s: %s", args.config, error)
+        return _run_command(args.command, None)
+
+    key = crangler_key(args.cache_dir, config, args.command[0], args.preprocessor)
+    with _key_lock(args.cache_dir, key):
+        if key is not None and restore(args.cache_dir, key, [output], False) == 0:
+            print(
+                f"cache.py: {output} restored from cache entry {key}; "
+                f"did not run '{' '.join(args.command)}'", file=sys.stderr)
+            return 0
+        returncode = _run_command(args.command, None)
+        stored = key is not None and not returncode
+        if stored:
+            store(args.cache_dir, key, [output], None, returncode)
+
+    if stored:
+        evict(args.cache_dir, args.max_size)
+    return returncode
+
+
+def main():
+    args = get_args()
+    logging.basicConfig(
+        format="cache.py: %(message)s",
+        level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    if args.subcommand == "run":
+        sys.exit(run(args))
+    if args.subcommand == "compile":
+        sys.exit(compile_objects(args))
+    if args.subcommand == "crangle":
+        sys.exit(crangle_source(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import pathlib
+import re
+import shlex
+import subprocess
+import sys
+
+from manifest import proof_manifest
+
+
+DESCRIPTION = """Print the files that each CBMC proof depends on, or the
+proofs affected by the changes since a git revision."""
+
+# Keep the epilog hard-wrapped at 70 characters, as it gets printed
+# verbatim in the terminal. 70 characters stops here --------------> |
+EPILOG = """
+The files a proof depends on are the files in PROJECT_SOURCES and
+PROOF_SOURCES, the sources of REWRITTEN_SOURCES, the headers included
+by all of these source files, the makefiles read by the proof Makefile
+(including Makefile.common and Makefile-project-defines), and all
+files in the proof directory itself.  The headers are found by running
+the preprocessor used by goto-cc on each source file.
+"""
+# 70 characters stops here ----------------------------------------> |
+
+# The proof manifest that run-cbmc-proofs.py keeps in the proof root
+MANIFEST_FILE = (
+    pathlib.Path(__file__).resolve().parent.parent / "output" /
+    "proof-manifest.json")
+
+# Preprocessor line markers look like: # 12 "path/to/file.h" 2
+_LINE_MARKER = re.compile(r'^#\s*\d+\s+"(?P<path>[^"]+)"')
+
+
+def get_args():
+    pars = argparse.ArgumentParser(
+        description=DESCRIPTION, epilog=EPILOG,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    for arg in [{
+            "flags": ["proof_dirs"],
+            "metavar": "DIR",
+            "nargs": "+",
+            "help": "proof directory",
+    }, {
+            "flags": ["--changed-since"],
+            "metavar": "REV",
+            "help": (
+                "print only the proof directories affected by the changes "
+                "made since git revision REV"),
+    }]:
+        flags = arg.pop("flags")
+        pars.add_argument(*flags, **arg)
+    return pars.parse_args()
+
+
+################################################################
+# Dependencies
+
+
+def _preprocessor_command(variables):
+    return [
+        *shlex.split(variables["GOTO_CC"]), "-E",
+        *shlex.split(variables["COMPILE_FLAGS"]),
+        *shlex.split(variables["INCLUDES"]),
+        *shlex.split(variables["DEFINES"]),
+    ]
+
+
+def included_files(cmd, source):
+    """Files read by the preprocessor command cmd when preprocessing source.
+
+    Raise UserWarning if the source file cannot be preprocessed.
+    """
+
+    try:
+        proc = subprocess.run(
+            [*cmd, source], universal_newlines=True, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, check=False, errors="replace")
+    except OSError as error:
+        raise UserWarning(f"could not preprocess {source}: {error}") from error
+    if proc.returncode:
+        raise UserWarning(f"could not preprocess {source}")
+
+    files = set()
+    for line in proc.stdout.splitlines():
+        match = _LINE_MARKER.match(line)
+        if match and not match["path"].startswith("<"):
+            files.add(os.path.realpath(match["path"]))
+    return files
+
+
+def proof_dependencies(variables):
+    """Map each proof directory to the sorted list of files it depends on.
+
+    The argument variables maps each proof directory to the values of the
+    make variables in manifest.DEPENDENCY_VARIABLES, or to None if they are
+    not known.  A proof
+    is mapped to None if its dependencies cannot be determined.
+    """
+
+    workers = os.cpu_count() or 1
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        # Preprocess each source file only once for each distinct set of
+        # preprocessor flags, however many proofs use it
+        jobs = {}
+        for proof_dir, values in variables.items():
+            if values is None:
+                continue
+            cmd = tuple(_preprocessor_command(values))
+            for source in values["PROOF_INPUTS"].split():
+                if source.endswith(".c") and (cmd, source) not in jobs:
+                    jobs[(cmd, source)] = pool.submit(included_files, cmd, source)
+
+        index = {}
+        for proof_dir, values in variables.items():
+            if values is None:
+                index[str(proof_dir)] = None
+                continue
+            cmd = tuple(_preprocessor_command(values))
+            files = {
+                os.path.realpath(path)
+                for path in values["PROOF_INPUTS"].split()}
+            try:
+                for source in values["PROOF_INPUTS"].split():
+                    if source.endswith(".c"):
+                        files |= jobs[(cmd, source)].result()
+            except UserWarning as error:
+                logging.warning("%s: %s", proof_dir, error)
+                index[str(proof_dir)] = None
+                continue
+            index[str(proof_dir)] = sorted(files)
+    return index
+
+
+################################################################
+# Changed files
+
+
+def changed_files(rev, cwd):
+    """Absolute paths of files changed since git revision rev.
+
+    This includes uncommitted changes and untracked files.  A submodule
+    whose commit changed contributes the files changed between its old
+    commit and its working tree, or all of its files if it was added or
+    its old commit is not available.
+    """
+
+    top = pathlib.Path(_git(cwd, "rev-parse", "--show-toplevel")[0]).resolve()
+    changed = set()
+    for line in _git(cwd, "diff", "--raw", "--no-abbrev", "--no-renames", rev, "--"):
+        info, _, name = line.partition("\t")
+        old_mode, new_mode, old_commit = info.lstrip(":").split()[:3]
+        changed.add(str(top / name))
+        if new_mode == _GITLINK:
+            changed |= _submodule_files(
+                top / name, old_commit if old_mode == _GITLINK else None)
+    names = _git(
+        cwd, "ls-files", "--others", "--exclude-standard", "--full-name",
+        str(top))
+    return changed | {str(top / name) for name in names}
+
+
+# The mode git records for the commit of a submodule
+_GITLINK = "160000"
+
+
+def _submodule_files(path, old_commit):
+    if not (path / ".git").exists():
+        # The submodule is not checked out, so nothing can depend on it
+        return set()
+    try:
+        if old_commit is not None:
+            _git(path, "cat-file", "-e", f"{old_commit}^{{commit}}", quiet=True)
+            return changed_files(old_commit, path)
+    except UserWarning as error:
+        logging.debug("%s", error)
+    return {str(path / name) for name in _git(path, "ls-files")}
+
+
+def _git(cwd, *args, quiet=False):
+    cmd = ["git", *args]
+    logging.debug(" ".join(cmd))
+    proc = subprocess.run(
+        cmd, cwd=cwd, universal_newlines=True, stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL if quiet else None, check=False)
+    if proc.returncode:
+        raise UserWarning(f"Failed to run command: {' '.join(cmd)}")
+    return proc.stdout.splitlines()
+
+
+def affected_proofs(index, changed):
+    """Proof directories in index that depend on a file in changed.
+
+    A proof with unknown dependencies is always affected.
+    """
+
+    affected = []
+    for proof_dir, files in index.items():
+        prefix = os.path.join(os.path.realpath(proof_dir), "")
+        if (files is None or
+                any(path.startswith(prefix) for path in changed) or
+                any(path in changed for path in files)):
+            affected.append(proof_dir)
+    return affected
+
+
+def main():
+    args = get_args()
+    logging.basicConfig(format="dependencies.py: %(message)s")
+
+    proof_dirs = [os.path.realpath(proof_dir) for proof_dir in args.proof_dirs]
+    index = proof_dependencies(proof_manifest(proof_dirs, MANIFEST_FILE))
+    if args.changed_since is None:
+        print(json.dumps(index, indent=2))
+        return
+
+    try:
+        changed = changed_files(args.changed_since, proof_dirs[0])
+    except UserWarning as error:
+        logging.critical("%s", error)
+        sys.exit(1)
+    for proof_dir in affected_proofs(index, changed):
+        print(proof_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+"""Discover the proof directories under the proof root.
+
+A proof directory is a directory containing the marker file.  The search
+skips the directories that proofs and Litani runs write their artifacts
+to, like gotos/ and output/, and hidden directories like .git/.
+
+The result is kept in an index file that records the modification time
+of every directory searched:
+  {"marker": MARKER, "dirs": {DIR: MTIME, ...}, "proofs": [DIR, ...]}
+Creating, deleting or renaming a file or directory changes the
+modification time of the directory containing it, so while no searched
+directory has changed, the proof directories are the same and the
+search can be skipped.
+"""
+
+
+import json
+import logging
+import os
+
+
+# Directories written by the proof Makefiles and by Litani
+PRUNED_DIRS = {"gotos", "logs", "report", "output", "__pycache__"}
+
+
+def _is_pruned(name):
+    return name in PRUNED_DIRS or name.startswith(".")
+
+
+def search(proof_root, marker_file):
+    """Search proof_root for proof directories.
+
+    Return the proof directories and the modification times of the
+    directories searched.
+    """
+
+    proofs = []
+    mtimes = {}
+    stack = [str(proof_root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            mtimes[directory] = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not _is_pruned(entry.name):
+                            stack.append(entry.path)
+                    elif entry.name == marker_file:
+                        proofs.append(directory)
+        except OSError as error:
+            logging.debug("Could not search %s: %s", directory, error)
+    return sorted(proofs), mtimes
+
+
+def is_current(index, marker_file):
+    if not index or index.get("marker") != marker_file:
+        return False
+    for directory, mtime in index.get("dirs", {}).items():
+        try:
+            if os.stat(directory).st_mtime_ns != mtime:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def proof_dirs(proof_root, marker_file, index_file):
+    """The sorted list of proof directories under proof_root."""
+
+    try:
+        with open(index_file, encoding="utf-8") as handle:
+            index = json.load(handle)
+    except (OSError, json.decoder.JSONDecodeError):
+        index = None
+
+    if is_current(index, marker_file):
+        logging.debug("Using proof directories in %s", index_file)
+        return index["proofs"]
+
+    # Create the directory holding the index before the search, so that
+    # creating it does not invalidate the index
+    os.makedirs(os.path.dirname(os.path.abspath(index_file)), exist_ok=True)
+    proofs, mtimes = search(proof_root, marker_file)
+    try:
+        tmp_file = f"{index_file}.{os.getpid()}"
+        with open(tmp_file, "w", encoding="utf-8") as handle:
+            json.dump(
+                {"marker": marker_file, "dirs": mtimes, "proofs": proofs},
+                handle)
+        os.replace(tmp_file, index_file)
+    except OSError as error:
+        logging.debug("Could not write %s: %s", index_file, error)
+    return proofs
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import argparse
+import concurrent.futures
+import logging
+import os
+import signal
+import subprocess
+import sys
+
+from dependencies import included_files
+
+
+DESCRIPTION = """Run a goto-cc compilation command and write a make
+dependency file listing the headers its source files include."""
+
+# Keep the epilog hard-wrapped at 70 characters, as it gets printed
+# verbatim in the terminal. 70 characters stops here --------------> |
+EPILOG = """
+After the compilation command succeeds, each source file is run
+through the preprocessor with the flags of the compilation command,
+and the files named in the line markers of the preprocessed text are
+written to the dependency file as prerequisites of the target, like
+the dependency files written by gcc -MD -MP.  If the compilation
+command fails, or a source file cannot be preprocessed, the dependency
+file is removed, so make rebuilds the target the next time.
+
+The compilation command may be prefixed by a wrapper command like
+lib/cache.py that ends its own arguments with '--': the compiler
+command is the part of the command after the last '--'.
+
+Makefile.common compiles the project and proof sources this way when
+INCREMENTAL is set, and includes the dependency files.
+"""
+# 70 characters stops here ----------------------------------------> |
+
+
+def get_args():
+    pars = argparse.ArgumentParser(
+        description=DESCRIPTION, epilog=EPILOG,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    for arg in [{
+            "flags": ["--depfile"],
+            "metavar": "FILE",
+            "required": True,
+            "help": "make dependency file to write",
+    }, {
+            "flags": ["--target"],
+            "metavar": "FILE",
+            "required": True,
+            "help": "the make target built by the command",
+    }, {
+            "flags": ["--sources"],
+            "metavar": "FILE",
+            "nargs": "+",
+            "required": True,
+            "help": "the source files compiled by the command",
+    }, {
+            "flags": ["command"],
+            "metavar": "-- COMMAND",
+            "nargs": argparse.REMAINDER,
+            "help": "the compilation command",
+    }]:
+        flags = arg.pop("flags")
+        pars.add_argument(*flags, **arg)
+
+    args = pars.parse_args()
+    if args.command and args.command[0] == "--":
+        args.command = args.command[1:]
+    if not args.command:
+        pars.error("no command given")
+    return args
+
+
+def preprocessor_command(command, sources):
+    """The compiler in command with its flags and -E, without sources."""
+
+    if "--" in command:
+        command = command[len(command) - command[::-1].index("--"):]
+    cmd = []
+    words = iter(command)
+    for word in words:
+        if word == "-o":
+            next(words, None)
+        elif word not in sources:
+            cmd.append(word)
+    return [*cmd, "-E"]
+
+
+def header_dependencies(command, sources):
+    """The files other than sources read when preprocessing sources.
+
+    Raise UserWarning if a source file cannot be preprocessed.
+    """
+
+    cmd = preprocessor_command(command, sources)
+    workers = os.cpu_count() or 1
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        included = pool.map(lambda source: included_files(cmd, source), sources)
+        files = set().union(*included)
+    return sorted(files - {os.path.realpath(source) for source in sources})
+
+
+def write_depfile(depfile, target, headers):
+    lines = [f"{target}: \\"]
+    lines.extend(f"  {header} \\" for header in headers)
+    lines.append("")
+    # An empty rule for each header keeps make working when it is deleted
+    lines.extend(f"{header}:" for header in headers)
+
+    os.makedirs(os.path.dirname(os.path.abspath(depfile)), exist_ok=True)
+    tmp_file = f"{depfile}.{os.getpid()}"
+    with open(tmp_file, "w", encoding="utf-8") as handle:
+        handle.write("\n".join(lines) + "\n")
+    os.replace(tmp_file, depfile)
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _run_command(command):
+    with subprocess.Popen(command) as proc:
+
+        def forward(signum, _frame):
+            proc.send_signal(signum)
+        for signum in [signal.SIGTERM, signal.SIGINT]:
+            signal.signal(signum, forward)
+
+        return proc.wait()
+
+
+def main():
+    args = get_args()
+    logging.basicConfig(format="header_deps.py: %(message)s")
+
+    _remove(args.depfile)
+    returncode = _run_command(args.command)
+    if returncode:
+        sys.exit(returncode)
+
+    try:
+        headers = header_dependencies(args.command, args.sources)
+    except UserWarning as error:
+        logging.warning("not writing %s: %s", args.depfile, error)
+        sys.exit(0)
+    write_depfile(args.depfile, args.target, headers)
+
+
+if __name__ == "__main__":
+    main()
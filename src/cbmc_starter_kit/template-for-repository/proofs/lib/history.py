@@ -0,0 +1,144 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+"""Durations and memory use of proofs in previous Litani runs.
+
+After each run, the proof pipelines in the Litani run.json file are merged
+into a history file that maps each PROOF_UID to
+  * "duration": the total duration in seconds of all the jobs in its
+    pipeline (building, checking, and reporting), which is the work a
+    proof adds to the shard that runs it (see run-cbmc-proofs.py --shard),
+  * "memory": the peak resident set size in bytes of any job in its
+    pipeline, if Litani profiled the memory use of the jobs.  The peak of
+    a job that runs several CBMC processes at once (a race of SAT solvers,
+    or the parallel checks that produce traces) covers all of them.
+Pipelines missing from a run keep the values recorded by an earlier run.
+"""
+
+
+import json
+import logging
+import statistics
+
+from litani_jobs import RUN_PIPELINES
+
+
+def pipeline_history(run_dict):
+    """Map each pipeline in a Litani run to its duration and memory use.
+
+    Pipelines with a job that did not complete are omitted.
+    """
+
+    history = {}
+    for pipeline in run_dict["pipelines"]:
+        if pipeline["name"] in RUN_PIPELINES:
+            continue
+        jobs = [
+            job for stage in pipeline["ci_stages"] for job in stage["jobs"]]
+        if not jobs or not all(job.get("complete") for job in jobs):
+            continue
+        record = {"duration": sum(job.get("duration") or 0 for job in jobs)}
+        peaks = [
+            (job.get("memory_trace") or {}).get("peak", {}).get("rss")
+            for job in jobs
+        ]
+        peaks = [peak for peak in peaks if peak]
+        if peaks:
+            record["memory"] = max(peaks)
+        history[pipeline["name"]] = record
+    return history
+
+
+def load_history(history_file):
+    """The history in history_file, or an empty history."""
+
+    try:
+        with open(history_file, encoding="utf-8") as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.decoder.JSONDecodeError) as error:
+        logging.warning("Ignoring proof history %s: %s", history_file, error)
+        return {}
+
+
+def update_history(history_file, run_file):
+    """Merge the pipelines in run_file into history_file."""
+
+    try:
+        with open(run_file, encoding="utf-8") as handle:
+            pipelines = pipeline_history(json.load(handle))
+    except FileNotFoundError:
+        return
+    except (OSError, KeyError, json.decoder.JSONDecodeError) as error:
+        logging.warning("Could not read proof history from %s: %s", run_file, error)
+        return
+
+    history = load_history(history_file)
+    for uid, record in pipelines.items():
+        history.setdefault(uid, {}).update(record)
+    with open(history_file, "w", encoding="utf-8") as handle:
+        json.dump(history, handle, indent=2, sort_keys=True)
+
+
+def expected_durations(proof_uids, history, expensive):
+    """Map each proof in proof_uids to its expected duration.
+
+    A proof with no recorded duration is expected to take as long as the
+    slowest recorded proof if it is in expensive, and as long as the median
+    recorded proof otherwise.  With no history at all, proofs in expensive
+    are expected to take longer than the others.
+    """
+
+    durations = {
+        uid: history[uid]["duration"] for uid in proof_uids
+        if "duration" in history.get(uid, {})
+    }
+    known = list(durations.values())
+    slowest = max(known, default=1)
+    typical = statistics.median(known) if known else 0
+    return {
+        uid: durations.get(uid, slowest if uid in expensive else typical)
+        for uid in proof_uids
+    }
+
+
+def longest_proofs(expected, parallelism):
+    """The proofs in expected that would stretch the run if started late.
+
+    A run on parallelism job slots takes at least the total expected
+    duration divided by parallelism.  A proof expected to take longer than
+    that ends after all other proofs unless it starts early, so these
+    proofs are returned, longest first.  There are always fewer than
+    parallelism of them, so at least one slot is left for the others.
+    """
+
+    share = sum(expected.values()) / parallelism
+    return sorted(
+        (proof for proof in expected if expected[proof] > share),
+        key=lambda proof: (-expected[proof], proof))
+
+
+def expected_memory(proof_uid, history):
+    """The peak memory use in bytes recorded for proof_uid, or None."""
+
+    return history.get(proof_uid, {}).get("memory")
+
+
+def partition(expected, count):
+    """Split the proofs in expected into count lists of similar total duration.
+
+    The proofs are assigned longest first to the list with the smallest total
+    expected duration so far.  Ties are broken by name and by list number, so
+    the partition depends only on expected.
+    """
+
+    shards = [[] for _ in range(count)]
+    totals = [0] * count
+    for proof in sorted(expected, key=lambda proof: (-expected[proof], proof)):
+        shard = min(
+            range(count), key=lambda i: (totals[i], len(shards[i]), i))
+        shards[shard].append(proof)
+        totals[shard] += expected[proof]
+    return shards
@@ -0,0 +1,224 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+"""Record the Litani jobs that a proof Makefile adds and add them in bulk.
+
+Running 'litani add-job' once for every job of every proof means starting
+a Python interpreter roughly fifteen times per proof.  Instead, the proof
+Makefile is run with LITANI set to a shell builtin that writes the
+arguments of each 'litani add-job' command to a record file.  The
+recorded jobs of all proofs are then added to the Litani run with a
+single 'litani set-jobs' command.
+"""
+
+
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import shlex
+import subprocess
+import tempfile
+
+
+# The pipelines that run-cbmc-proofs.py adds to a run besides the proofs
+RUN_PIPELINES = [
+    "print_tool_versions", "wait_for_safety_checks", "build_viewer_index"]
+
+
+def recorder(record_file, sentinel):
+    """A value of LITANI that records each Litani command in record_file.
+
+    The arguments of each command are written to record_file terminated
+    by null characters, and each command starts with sentinel.
+    """
+
+    return f"printf '%s\\0' >>{shlex.quote(str(record_file))} {sentinel}"
+
+
+def read_jobs(record_file, sentinel):
+    """The 'litani add-job' command lines recorded in record_file."""
+
+    try:
+        with open(record_file, encoding="utf-8") as handle:
+            words = handle.read().split("\0")[:-1]
+    except FileNotFoundError:
+        return []
+
+    commands = []
+    for word in words:
+        if word == sentinel:
+            commands.append([])
+        else:
+            commands[-1].append(word)
+    for command in commands:
+        if command[:1] != ["add-job"]:
+            raise UserWarning(
+                f"Unexpected Litani command: litani {' '.join(command)}")
+    return [command[1:] for command in commands]
+
+
+def failed_outputs(run_dict):
+    """The outputs of the jobs in a Litani run that did not succeed.
+
+    Litani writes the stdout file of a job even when the job fails, times
+    out, or runs out of memory, so the output of a failed CBMC job is
+    newer than its inputs and make would not add the job to the next
+    incremental run.  A job succeeded if it completed within its timeout
+    and its outcome was a success or a failure that the job ignores, like
+    CBMC returning 10 for a failed property.
+    """
+
+    outputs = []
+    for pipeline in run_dict["pipelines"]:
+        for stage in pipeline["ci_stages"]:
+            for job in stage["jobs"]:
+                if (job.get("complete") and not job.get("timeout_reached") and
+                        job.get("outcome") in ["success", "fail_ignored"]):
+                    continue
+                outputs.extend(
+                    job.get("wrapper_arguments", {}).get("outputs") or [])
+    return outputs
+
+
+def _add_job_parser():
+    # The flags of 'litani add-job'.  The jobs passed to 'litani set-jobs'
+    # must have exactly the keys that 'litani add-job' would produce.
+    pars = argparse.ArgumentParser(prog="litani add-job", add_help=False)
+    for arg in [{
+            "flags": ["--command"],
+            "required": True,
+    }, {
+            "flags": ["--inputs"],
+            "nargs": "+",
+    }, {
+            "flags": ["--outputs"],
+            "nargs": "+",
+    }, {
+            "flags": ["--phony-outputs"],
+            "nargs": "*",
+    }, {
+            "flags": ["--description"],
+    }, {
+            "flags": ["--tags"],
+            "nargs": "+",
+    }, {
+            "flags": ["--pipeline-name"],
+            "required": True,
+    }, {
+            "flags": ["--ci-stage"],
+            "required": True,
+    }, {
+            "flags": ["--cwd"],
+    }, {
+            "flags": ["--timeout"],
+            "type": int,
+    }, {
+            "flags": ["--timeout-ok"],
+            "action": "store_true",
+    }, {
+            "flags": ["--timeout-ignore"],
+            "action": "store_true",
+    }, {
+            "flags": ["--ignore-returns"],
+            "nargs": "+",
+    }, {
+            "flags": ["--ok-returns"],
+            "nargs": "+",
+    }, {
+            "flags": ["--outcome-table"],
+    }, {
+            "flags": ["--interleave-stdout-stderr"],
+            "action": "store_true",
+    }, {
+            "flags": ["--stdout-file"],
+    }, {
+            "flags": ["--stderr-file"],
+    }, {
+            "flags": ["--pool"],
+    }, {
+            "flags": ["--profile-memory"],
+            "action": "store_true",
+    }, {
+            "flags": ["--profile-memory-interval"],
+            "type": int,
+            "default": 10,
+    }]:
+        flags = arg.pop("flags")
+        pars.add_argument(*flags, **arg)
+    return pars
+
+
+def job_dict(arguments):
+    """The Litani job for the 'litani add-job' arguments."""
+
+    try:
+        args, unknown = _add_job_parser().parse_known_args(arguments)
+    except SystemExit as error:
+        raise UserWarning(
+            f"Could not parse: litani add-job {' '.join(arguments)}") from error
+    if unknown:
+        raise UserWarning(
+            f"Unknown arguments to litani add-job: {' '.join(unknown)}")
+    return {
+        "subcommand": "add-job",
+        "verbose": False,
+        "very_verbose": False,
+        **vars(args),
+    }
+
+
+def add_jobs(litani, jobs, workers=1):
+    """Add the 'litani add-job' arguments in jobs to the current Litani run.
+
+    The jobs are added with a single 'litani set-jobs' command.  If this
+    version of Litani cannot do that, they are added one at a time.
+    """
+
+    try:
+        _set_jobs(litani, [job_dict(job) for job in jobs])
+        return
+    except UserWarning as error:
+        logging.debug("%s", error)
+        logging.debug("Adding jobs one at a time")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        failed = [
+            job for job, returncode in zip(jobs, pool.map(
+                lambda job: _run([str(litani), "add-job", *job]).returncode,
+                jobs))
+            if returncode
+        ]
+    if failed:
+        raise UserWarning(
+            f"Could not add {len(failed)} of {len(jobs)} jobs to the Litani run")
+
+
+def _set_jobs(litani, jobs):
+    proc = _run([str(litani), "get-jobs"], stdout=subprocess.PIPE)
+    if proc.returncode:
+        raise UserWarning("Could not get jobs with 'litani get-jobs'")
+    try:
+        existing = json.loads(proc.stdout)
+    except json.decoder.JSONDecodeError as error:
+        raise UserWarning("Could not parse output of 'litani get-jobs'") from error
+
+    fd, jobs_file = tempfile.mkstemp(prefix="litani-jobs-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as handle:
+            json.dump(existing + jobs, handle)
+        proc = _run([str(litani), "set-jobs", "--from-file", jobs_file])
+    finally:
+        os.unlink(jobs_file)
+    if proc.returncode:
+        raise UserWarning("Could not add jobs with 'litani set-jobs'")
+    logging.debug("Added %d jobs with 'litani set-jobs'", len(jobs))
+
+
+def _run(cmd, stdout=subprocess.DEVNULL):
+    logging.debug(" ".join(cmd))
+    return subprocess.run(
+        cmd, universal_newlines=True, stdout=stdout, stderr=subprocess.PIPE,
+        check=False)
@@ -0,0 +1,232 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+"""Effective make variables of the proofs, cached in a manifest.
+
+The manifest is a JSON file that maps each proof directory to the values
+of the make variables in PROOF_VARIABLES, as evaluated by make in that
+directory, and to the makefiles that make read to evaluate them:
+  {"proofs": {DIR: {"variables": {NAME: VALUE, ...},
+                    "makefiles": {PATH: MTIME, ...},
+                    "environment": {NAME: VALUE, ...}}, ...},
+   "project": {...},
+   "litani": {"path": PATH, "mtime": MTIME, "capabilities": [...]}}
+The "project" entry holds the variables in PROJECT_VARIABLES evaluated
+with Makefile.common in the proof root.  An entry is evaluated again
+when a makefile it was read from has changed or disappeared, or when
+the environment overrides one of its variables differently.  The
+"litani" entry holds the capabilities that Litani prints, and is
+queried again when the Litani executable changes.
+"""
+
+
+import concurrent.futures
+import json
+import logging
+import os
+import shutil
+import subprocess
+
+
+# Make variables needed to compute the dependencies of a proof (see
+# dependencies.py)
+DEPENDENCY_VARIABLES = [
+    "PROOF_INPUTS", "GOTO_CC", "COMPILE_FLAGS", "INCLUDES", "DEFINES"]
+
+PROOF_VARIABLES = [
+    "PROOF_UID",
+    "HARNESS_ENTRY",
+    "HARNESS_FILE",
+    "PROJECT_SOURCES",
+    "PROOF_SOURCES",
+    "UNWINDSET",
+    "EXPENSIVE",
+    "CBMCFLAGS",
+    "PROPERTY_SHARDS",
+    "PROOF_MEMORY_ESTIMATE",
+    "SRCDIR",
+    "VIEWER_EXCLUDE",
+    *DEPENDENCY_VARIABLES,
+]
+
+PROJECT_VARIABLES = ["PROJECT_NAME", "LITANI"]
+
+
+def make_variables(directory, names, makefile=None):
+    """Evaluate the make variables names in directory.
+
+    Return the values and the modification times of the makefiles read.
+    Raise UserWarning if make fails.
+    """
+
+    cmd = ["make", "--no-print-directory"]
+    if makefile:
+        cmd.extend(["-f", makefile])
+    cmd.extend([
+        f"PRINT_VARIABLES={' '.join(names)} MAKEFILE_LIST",
+        "echo-variables",
+    ])
+    logging.debug(" ".join(cmd))
+    try:
+        proc = subprocess.run(
+            cmd, cwd=directory, universal_newlines=True, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, check=False)
+    except OSError as error:
+        raise UserWarning(
+            f"could not evaluate make variables in {directory}: {error}"
+        ) from error
+    if proc.returncode:
+        raise UserWarning(
+            f"could not evaluate make variables in {directory}: "
+            f"{proc.stderr.strip()}")
+
+    values = {}
+    for line in proc.stdout.splitlines():
+        name, _, value = line.partition("=")
+        if name in names or name == "MAKEFILE_LIST":
+            values[name] = value
+
+    makefiles = {}
+    for path in values.pop("MAKEFILE_LIST", "").split():
+        path = os.path.abspath(os.path.join(directory, path))
+        try:
+            makefiles[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            logging.debug("Could not stat makefile %s", path)
+    return {
+        "variables": {name: values.get(name, "") for name in names},
+        "makefiles": makefiles,
+        "environment": _environment(names),
+    }
+
+
+def _environment(names):
+    return {name: os.environ[name] for name in names if name in os.environ}
+
+
+def is_current(entry, names):
+    """Whether the manifest entry is still valid."""
+
+    if not entry or sorted(entry.get("variables", {})) != sorted(names):
+        return False
+    if entry.get("environment") != _environment(names):
+        return False
+    for path, mtime in entry.get("makefiles", {}).items():
+        try:
+            if os.stat(path).st_mtime_ns != mtime:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def load_manifest(manifest_file):
+    try:
+        with open(manifest_file, encoding="utf-8") as handle:
+            manifest = json.load(handle)
+    except FileNotFoundError:
+        manifest = {}
+    except (OSError, json.decoder.JSONDecodeError) as error:
+        logging.warning("Ignoring proof manifest %s: %s", manifest_file, error)
+        manifest = {}
+    manifest.setdefault("proofs", {})
+    return manifest
+
+
+def save_manifest(manifest_file, manifest):
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_file)), exist_ok=True)
+    tmp_file = f"{manifest_file}.{os.getpid()}"
+    with open(tmp_file, "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    os.replace(tmp_file, manifest_file)
+
+
+def proof_manifest(proof_dirs, manifest_file):
+    """Map each proof directory to the values of PROOF_VARIABLES.
+
+    Entries of the manifest that are out of date are evaluated again, in
+    parallel.  A proof is mapped to None if make fails in its directory.
+    """
+
+    manifest = load_manifest(manifest_file)
+    proofs = manifest["proofs"]
+    stale = [
+        str(proof_dir) for proof_dir in proof_dirs
+        if not is_current(proofs.get(str(proof_dir)), PROOF_VARIABLES)]
+
+    if stale:
+        logging.debug("Evaluating make variables of %d proofs", len(stale))
+        workers = os.cpu_count() or 1
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            for proof_dir, entry in zip(stale, pool.map(_try_proof_entry, stale)):
+                if entry is None:
+                    proofs.pop(proof_dir, None)
+                else:
+                    proofs[proof_dir] = entry
+        save_manifest(manifest_file, manifest)
+
+    return {
+        proof_dir: (proofs[str(proof_dir)]["variables"]
+                    if str(proof_dir) in proofs else None)
+        for proof_dir in proof_dirs
+    }
+
+
+def _try_proof_entry(proof_dir):
+    try:
+        return make_variables(proof_dir, PROOF_VARIABLES)
+    except UserWarning as error:
+        logging.warning("%s", error)
+        return None
+
+
+def project_variables(proof_root, manifest_file):
+    """The values of PROJECT_VARIABLES in the proof root.
+
+    Raise UserWarning if make fails.
+    """
+
+    manifest = load_manifest(manifest_file)
+    if not is_current(manifest.get("project"), PROJECT_VARIABLES):
+        manifest["project"] = make_variables(
+            proof_root, PROJECT_VARIABLES, makefile="Makefile.common")
+        save_manifest(manifest_file, manifest)
+    return manifest["project"]["variables"]
+
+
+def litani_capabilities(litani, manifest_file):
+    """The capabilities that litani prints with print-capabilities."""
+
+    path = shutil.which(litani)
+    try:
+        mtime = os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        mtime = None
+
+    manifest = load_manifest(manifest_file)
+    entry = manifest.get("litani") or {}
+    if mtime is not None and entry.get("path") == path and entry.get("mtime") == mtime:
+        return entry["capabilities"]
+
+    cmd = [litani, "print-capabilities"]
+    logging.debug(" ".join(cmd))
+    try:
+        proc = subprocess.run(
+            cmd, universal_newlines=True, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, check=False)
+    except OSError:
+        return []
+    if proc.returncode:
+        return []
+    try:
+        capabilities = json.loads(proc.stdout)
+    except json.decoder.JSONDecodeError:
+        logging.warning("Could not load litani capabilities: '%s'", proc.stdout)
+        return []
+
+    if mtime is not None:
+        manifest["litani"] = {
+            "path": path, "mtime": mtime, "capabilities": capabilities}
+        save_manifest(manifest_file, manifest)
+    return capabilities
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import argparse
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from cache import parse_size
+from history import expected_memory, load_history
+
+
+DESCRIPTION = """Run a command once enough of a shared memory budget is
+available for it."""
+
+# Keep the epilog hard-wrapped at 70 characters, as it gets printed
+# verbatim in the terminal. 70 characters stops here --------------> |
+EPILOG = """
+All commands run through this script with the same ledger share a
+memory budget.  Each command reserves its predicted peak memory use
+before it starts and releases it when it exits, and a command waits
+until its reservation fits in the budget.  The prediction is the peak
+memory use of the proof recorded in the proof history from an earlier
+run with memory profiling enabled, or else the declared estimate, or
+else an equal share of the budget for each processor.
+
+A command that runs several CBMC processes at once, like a race of SAT
+solvers or the property checks that produce traces in parallel,
+reserves the prediction once for each process it may run at once, as
+given by --processes.  The peak memory use that the proof history
+records for a proof is the peak of the job that used the most memory,
+summed over all the processes of that job.  Using it as the peak
+memory use of a single process errs on the side of reserving too much.
+
+Commands are admitted in the order they arrive, but a command may
+start ahead of a waiting command if it leaves enough room for the
+waiting command.  A command predicted to need more than the whole
+budget runs when nothing else is running.
+
+The time a command waits for memory does not count toward --timeout:
+the command is killed, and this script returns 124 (like timeout(1)),
+only if the command itself runs longer than --timeout seconds.
+
+Makefile.common runs the CBMC jobs through this script when
+MEMORY_BUDGET is set.
+"""
+# 70 characters stops here ----------------------------------------> |
+
+_POLL_INTERVAL = 1
+
+# The return code of a command that ran longer than --timeout, and the
+# seconds it is given to exit after it is asked to
+_TIMEOUT_RETURN = 124
+_KILL_GRACE = 10
+
+
+def get_args():
+    pars = argparse.ArgumentParser(
+        description=DESCRIPTION, epilog=EPILOG,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    for arg in [{
+            "flags": ["--budget"],
+            "metavar": "SIZE",
+            "required": True,
+            "type": parse_size,
+            "help": (
+                "total memory that the commands sharing the ledger may use "
+                "(suffixes K, M, G, T)"),
+    }, {
+            "flags": ["--ledger"],
+            "metavar": "FILE",
+            "required": True,
+            "help": "file recording the reservations of running commands",
+    }, {
+            "flags": ["--history"],
+            "metavar": "FILE",
+            "help": "proof history with the memory use of earlier runs",
+    }, {
+            "flags": ["--proof"],
+            "metavar": "UID",
+            "help": "PROOF_UID of the proof the command belongs to",
+    }, {
+            "flags": ["--estimate"],
+            "metavar": "SIZE",
+            "type": parse_size,
+            "help": (
+                "peak memory use of the command if the proof history does "
+                "not record it (suffixes K, M, G, T)"),
+    }, {
+            "flags": ["--processes"],
+            "metavar": "N",
+            "type": int,
+            "default": 1,
+            "help": (
+                "number of CBMC processes the command runs at once. "
+                "Default: %(default)s"),
+    }, {
+            "flags": ["--timeout"],
+            "metavar": "SECONDS",
+            "type": int,
+            "help": (
+                "kill the command if it runs longer than SECONDS, not "
+                "counting the time it waits for memory"),
+    }, {
+            "flags": ["command"],
+            "metavar": "-- COMMAND",
+            "nargs": argparse.REMAINDER,
+            "help": "the command to run",
+    }]:
+        flags = arg.pop("flags")
+        pars.add_argument(*flags, **arg)
+
+    pars.add_argument("--verbose", action="store_true", help="verbose output")
+
+    args = pars.parse_args()
+    if args.command and args.command[0] == "--":
+        args.command = args.command[1:]
+    if not args.command:
+        pars.error("no command given")
+    if args.processes < 1:
+        pars.error("--processes must be at least 1")
+    return args
+
+
+def predicted_memory(args):
+    if args.history and args.proof:
+        memory = expected_memory(args.proof, load_history(args.history))
+        if memory:
+            return memory
+    if args.estimate:
+        return args.estimate
+    return args.budget // (os.cpu_count() or 1)
+
+
+################################################################
+# The ledger
+#
+# The ledger is a JSON file with the reservations of the running commands
+# and the commands waiting to run, keyed by process id:
+#   {"running": {"PID": SIZE, ...}, "waiting": [["PID", SIZE], ...]}
+# Entries for processes that no longer exist are dropped whenever the
+# ledger is read, so a killed command does not hold its reservation.
+
+
+@contextlib.contextmanager
+def _ledger(path):
+    with open(path, "a+", encoding="utf-8") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        handle.seek(0)
+        try:
+            ledger = json.loads(handle.read() or "{}")
+        except json.decoder.JSONDecodeError:
+            ledger = {}
+        running = {
+            pid: size for pid, size in ledger.get("running", {}).items()
+            if _is_alive(pid)}
+        waiting = [
+            [pid, size] for pid, size in ledger.get("waiting", [])
+            if _is_alive(pid)]
+        ledger = {"running": running, "waiting": waiting}
+
+        yield ledger
+
+        handle.seek(0)
+        handle.truncate()
+        json.dump(ledger, handle)
+
+
+def _is_alive(pid):
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _try_reserve(ledger_file, pid, size, budget):
+    """Reserve size bytes for pid if they fit in the budget."""
+
+    with _ledger(ledger_file) as ledger:
+        if pid not in [waiter for waiter, _ in ledger["waiting"]]:
+            ledger["waiting"].append([pid, size])
+
+        reserved = sum(ledger["running"].values())
+        head, head_size = ledger["waiting"][0]
+        if head != pid:
+            # Leave room for the command that has waited longest
+            reserved += min(head_size, budget)
+        if (ledger["running"] or head != pid) and reserved + size > budget:
+            return False
+
+        ledger["waiting"] = [
+            waiter for waiter in ledger["waiting"] if waiter[0] != pid]
+        ledger["running"][pid] = size
+        return True
+
+
+def _release(ledger_file, pid):
+    with _ledger(ledger_file) as ledger:
+        ledger["running"].pop(pid, None)
+        ledger["waiting"] = [
+            waiter for waiter in ledger["waiting"] if waiter[0] != pid]
+
+
+################################################################
+
+
+def _run_command(command, timeout=None):
+    # The command runs in a process group of its own, so that a timeout
+    # kills all the processes it started, like the solvers in a race
+    with subprocess.Popen(command, start_new_session=True) as proc:
+
+        def forward(signum, _frame):
+            _signal_group(proc, signum)
+        for signum in [signal.SIGTERM, signal.SIGINT]:
+            signal.signal(signum, forward)
+
+        try:
+            return proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            logging.error("command timed out after %ds", timeout)
+        _signal_group(proc, signal.SIGTERM)
+        try:
+            proc.wait(timeout=_KILL_GRACE)
+        except subprocess.TimeoutExpired:
+            _signal_group(proc, signal.SIGKILL)
+            proc.wait()
+        return _TIMEOUT_RETURN
+
+
+def _signal_group(proc, signum):
+    try:
+        os.killpg(proc.pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def _exit_on_signal(signum, _frame):
+    sys.exit(128 + signum)
+
+
+def main():
+    args = get_args()
+    logging.basicConfig(
+        format="memory_budget.py: %(message)s",
+        level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    # Give up the place in the queue if the job is killed while waiting
+    for signum in [signal.SIGTERM, signal.SIGINT]:
+        signal.signal(signum, _exit_on_signal)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.ledger)), exist_ok=True)
+    pid = str(os.getpid())
+    size = predicted_memory(args) * args.processes
+    start = time.time()
+    try:
+        while not _try_reserve(args.ledger, pid, size, args.budget):
+            time.sleep(_POLL_INTERVAL)
+        logging.debug(
+            "reserved %d bytes after waiting %ds", size, time.time() - start)
+        returncode = _run_command(args.command, args.timeout)
+    finally:
+        _release(args.ledger, pid)
+    sys.exit(returncode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import argparse
+import datetime
+import json
+import logging
+import sys
+
+
+DESCRIPTION = """Merge the Litani run.json files written by the shards of a
+sharded proof run into a single run.json file."""
+
+# Keep the epilog hard-wrapped at 70 characters, as it gets printed
+# verbatim in the terminal. 70 characters stops here --------------> |
+EPILOG = """
+Each shard of a run started with `run-cbmc-proofs.py --shard I/N`
+writes the results of its own proofs to output/run.json.  This script
+combines the pipelines of all shards into one run that lib/summarize.py
+and dashboards can read as if the proofs had all run on one machine.
+The merged run starts when the first shard started, ends when the last
+shard ended, and succeeds only if every shard succeeded.
+"""
+# 70 characters stops here ----------------------------------------> |
+
+_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def get_args():
+    pars = argparse.ArgumentParser(
+        description=DESCRIPTION, epilog=EPILOG,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    for arg in [{
+            "flags": ["run_files"],
+            "metavar": "RUN_FILE",
+            "nargs": "+",
+            "help": "Litani run.json file written by one shard",
+    }, {
+            "flags": ["--out-file"],
+            "metavar": "FILE",
+            "required": True,
+            "help": "write the merged run.json file to FILE",
+    }]:
+        flags = arg.pop("flags")
+        pars.add_argument(*flags, **arg)
+    return pars.parse_args()
+
+
+def _duration_str(seconds):
+    hours, seconds = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m {seconds:02d}s"
+    if minutes:
+        return f"{minutes:02d}m {seconds:02d}s"
+    return f"{seconds:02d}s"
+
+
+def _merged_status(runs):
+    statuses = [run["status"] for run in runs]
+    if "in_progress" in statuses:
+        return "in_progress"
+    if all(status == "success" for status in statuses):
+        return "success"
+    return "fail"
+
+
+def merge_runs(runs):
+    """Merge a list of Litani run dicts into one run dict.
+
+    Pipelines with the same name in several runs (like the pipeline that
+    prints tool versions) appear once in the merged run.
+    """
+
+    merged = dict(runs[0])
+
+    merged["pipelines"] = []
+    names = set()
+    for run in runs:
+        for pipeline in run["pipelines"]:
+            if pipeline["name"] in names:
+                continue
+            names.add(pipeline["name"])
+            merged["pipelines"].append(pipeline)
+
+    merged["stages"] = []
+    for run in runs:
+        merged["stages"].extend(
+            stage for stage in run["stages"] if stage not in merged["stages"])
+
+    for key in ["aux", "pools"]:
+        merged[key] = {}
+        for run in runs:
+            merged[key].update(run.get(key) or {})
+
+    merged["status"] = _merged_status(runs)
+    merged["start_time"] = min(run["start_time"] for run in runs)
+    end_times = [run.get("end_time") for run in runs]
+    if all(end_times):
+        merged["end_time"] = max(end_times)
+        duration = (
+            datetime.datetime.strptime(merged["end_time"], _TIME_FORMAT) -
+            datetime.datetime.strptime(merged["start_time"], _TIME_FORMAT))
+        merged["__duration_str"] = _duration_str(duration.total_seconds())
+
+    parallelism = [run.get("parallelism") or {} for run in runs]
+    merged["parallelism"] = {
+        "trace": sorted(
+            (point for par in parallelism for point in par.get("trace", [])),
+            key=lambda point: point["time"]),
+        "max_parallelism": sum(
+            par.get("max_parallelism", 0) for par in parallelism),
+        "n_proc": sum(par.get("n_proc", 0) for par in parallelism),
+    }
+    return merged
+
+
+def main():
+    args = get_args()
+    logging.basicConfig(format="merge_runs.py: %(message)s")
+
+    runs = []
+    for run_file in args.run_files:
+        try:
+            with open(run_file, encoding="utf-8") as handle:
+                runs.append(json.load(handle))
+        except (OSError, json.decoder.JSONDecodeError) as error:
+            logging.critical("Could not read %s: %s", run_file, error)
+            sys.exit(1)
+
+    with open(args.out_file, "w", encoding="utf-8") as handle:
+        json.dump(merge_runs(runs), handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
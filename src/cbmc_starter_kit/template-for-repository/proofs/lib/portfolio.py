@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import argparse
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+
+DESCRIPTION = """Run a CBMC command with several SAT solvers at once and
+keep the result of the first to finish."""
+
+# Keep the epilog hard-wrapped at 70 characters, as it gets printed
+# verbatim in the terminal. 70 characters stops here --------------> |
+EPILOG = """
+Each solver is either 'default', meaning the SAT solver built into
+CBMC, or the name of a SAT solver executable that CBMC runs with
+--external-sat-solver.  Any --external-sat-solver flag in the CBMC
+command is replaced.
+
+The first solver to finish with a verdict (CBMC return code 0 or 10)
+wins the race: its output becomes the output of this script, and the
+CBMC commands using the other solvers are killed.  The winner is
+recorded for the proof in the record file.  Later runs of the proof
+use only the recorded winner, except that every N-th run races all the
+solvers again, in case a change to the proof favors another solver.
+
+Makefile.common runs the CBMC safety checks through this script when
+SAT_SOLVER_PORTFOLIO is set.
+"""
+# 70 characters stops here ----------------------------------------> |
+
+_DEFAULT_SOLVER = "default"
+
+# CBMC return codes for a completed check: all properties hold, or some
+# property fails
+_VERDICT_RETURNS = [0, 10]
+
+_POLL_INTERVAL = 0.1
+
+
+def get_args():
+    pars = argparse.ArgumentParser(
+        description=DESCRIPTION, epilog=EPILOG,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    subs = pars.add_subparsers(dest="subcommand", required=True)
+
+    run_parser = subs.add_parser(
+        "run", help="race a CBMC command with several SAT solvers")
+    for arg in [{
+            "flags": ["--solvers"],
+            "metavar": "SOLVER",
+            "nargs": "+",
+            "required": True,
+            "help": "SAT solvers to race ('default' or an executable)",
+    }, {
+            "flags": ["--record"],
+            "metavar": "FILE",
+            "required": True,
+            "help": "file recording the winning solver for each proof",
+    }, {
+            "flags": ["--proof"],
+            "metavar": "UID",
+            "required": True,
+            "help": "PROOF_UID of the proof the command belongs to",
+    }, {
+            "flags": ["--race-every"],
+            "metavar": "N",
+            "type": int,
+            "default": 10,
+            "help": (
+                "race all solvers again on every N-th run of a proof that "
+                "has a recorded winner. Default: %(default)s"),
+    }, {
+            "flags": ["command"],
+            "metavar": "-- COMMAND",
+            "nargs": argparse.REMAINDER,
+            "help": "the CBMC command",
+    }]:
+        flags = arg.pop("flags")
+        run_parser.add_argument(*flags, **arg)
+
+    run_parser.add_argument("--verbose", action="store_true", help="verbose output")
+
+    args = pars.parse_args()
+    if args.command and args.command[0] == "--":
+        args.command = args.command[1:]
+    if not args.command:
+        pars.error("no command given")
+    return args
+
+
+def solver_command(command, solver):
+    """The CBMC command with its SAT solver replaced by solver."""
+
+    cmd = []
+    words = iter(command)
+    for word in words:
+        if word == "--external-sat-solver":
+            next(words, None)
+        else:
+            cmd.append(word)
+    if solver != _DEFAULT_SOLVER:
+        cmd[1:1] = ["--external-sat-solver", solver]
+    return cmd
+
+
+################################################################
+# The record of winning solvers
+#
+# The record is a JSON file mapping each PROOF_UID to the last solver to
+# win a race and the number of runs since the proof was first raced:
+#   {"UID": {"solver": SOLVER, "runs": N}, ...}
+
+
+@contextlib.contextmanager
+def _record(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a+", encoding="utf-8") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        handle.seek(0)
+        try:
+            record = json.loads(handle.read() or "{}")
+        except json.decoder.JSONDecodeError:
+            record = {}
+
+        yield record
+
+        handle.seek(0)
+        handle.truncate()
+        json.dump(record, handle, indent=2, sort_keys=True)
+
+
+def solvers_to_run(args):
+    """The solvers to race in this run of the proof."""
+
+    with _record(args.record) as record:
+        entry = record.setdefault(args.proof, {"runs": 0})
+        winner = entry.get("solver")
+        race_all = (
+            winner not in args.solvers or
+            entry["runs"] % max(args.race_every, 1) == 0)
+        entry["runs"] += 1
+    if race_all:
+        return list(args.solvers)
+    return [winner]
+
+
+def record_winner(args, solver):
+    with _record(args.record) as record:
+        record.setdefault(args.proof, {"runs": 1})["solver"] = solver
+
+
+################################################################
+# The race
+
+
+def race(commands):
+    """Run the commands at once until one of them returns a verdict.
+
+    Copy the stdout and stderr of that command, or of the last command to
+    fail if none of them returns a verdict, to stdout and stderr, and
+    return its index and return code.  The other commands are killed.
+    """
+
+    tmp_dir = tempfile.mkdtemp(prefix="portfolio-")
+    procs = []
+    try:
+        for idx, command in enumerate(commands):
+            with open(os.path.join(tmp_dir, f"{idx}.out"), "wb") as stdout, \
+                    open(os.path.join(tmp_dir, f"{idx}.err"), "wb") as stderr:
+                logging.debug(" ".join(command))
+                # Each command runs in its own process group, so that killing
+                # it kills the external SAT solver that CBMC runs, too
+                procs.append(subprocess.Popen( # pylint: disable=consider-using-with
+                    command, stdout=stdout, stderr=stderr,
+                    start_new_session=True))
+
+        def kill_all(signum=signal.SIGTERM, _frame=None):
+            for proc in procs:
+                if proc.poll() is None:
+                    with contextlib.suppress(ProcessLookupError):
+                        os.killpg(proc.pid, signum)
+        for signum in [signal.SIGTERM, signal.SIGINT]:
+            signal.signal(signum, kill_all)
+
+        winner = None
+        running = set(range(len(procs)))
+        while running and winner is None:
+            time.sleep(_POLL_INTERVAL)
+            for idx in sorted(running):
+                returncode = procs[idx].poll()
+                if returncode is None:
+                    continue
+                running.remove(idx)
+                if returncode in _VERDICT_RETURNS:
+                    winner = idx
+                    break
+                logging.warning(
+                    "%s failed with return code %d",
+                    " ".join(commands[idx]), returncode)
+                if not running:
+                    winner = idx
+        kill_all()
+        for proc in procs:
+            proc.wait()
+
+        with open(os.path.join(tmp_dir, f"{winner}.out"), "rb") as handle:
+            shutil.copyfileobj(handle, sys.stdout.buffer)
+        sys.stdout.flush()
+        with open(os.path.join(tmp_dir, f"{winner}.err"), "rb") as handle:
+            shutil.copyfileobj(handle, sys.stderr.buffer)
+        sys.stderr.flush()
+        return winner, procs[winner].returncode
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _run_command(command):
+    with subprocess.Popen(command) as proc:
+
+        def forward(signum, _frame):
+            proc.send_signal(signum)
+        for signum in [signal.SIGTERM, signal.SIGINT]:
+            signal.signal(signum, forward)
+
+        return proc.wait()
+
+
+def run(args):
+    solvers = solvers_to_run(args)
+    commands = [solver_command(args.command, solver) for solver in solvers]
+    if len(commands) == 1:
+        logging.debug(" ".join(commands[0]))
+        return _run_command(commands[0])
+
+    start = time.time()
+    winner, returncode = race(commands)
+    if returncode in _VERDICT_RETURNS:
+        print(
+            f"portfolio.py: SAT solver '{solvers[winner]}' won the race "
+            f"among {', '.join(solvers)} in {time.time() - start:.0f}s",
+            file=sys.stderr)
+        record_winner(args, solvers[winner])
+    return returncode
+
+
+def main():
+    args = get_args()
+    logging.basicConfig(
+        format="portfolio.py: %(message)s",
+        level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    if args.subcommand == "run":
+        sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import argparse
+import concurrent.futures
+import logging
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+
+
+DESCRIPTION = """Check the properties of a proof with several CBMC jobs
+and merge their results."""
+
+# Keep the epilog hard-wrapped at 70 characters, as it gets printed
+# verbatim in the terminal. 70 characters stops here --------------> |
+EPILOG = """
+The 'run' subcommand reads the list of properties that CBMC prints
+with --show-properties --xml-ui, splits the list into N shards, and
+runs a CBMC command with one --property flag for each property in
+shard I appended to it.  The 'merge' subcommand merges the XML results
+of the N CBMC commands into one XML result that looks as if one CBMC
+command had checked all the properties.  Like CBMC, it exits with
+return code 10 if a property failed.
+
+The 'traces' subcommand reads the XML result of a CBMC command run
+without --trace, and runs a CBMC command with --trace restricted with
+--property to the properties that failed, splitting them into up to N
+shards checked in parallel.  The result with the traces of the failed
+properties added is printed, and the return code is 10 if a property
+failed.  No CBMC command is run if no property failed.
+
+Makefile.common checks the properties of a proof this way when
+PROPERTY_SHARDS or TRACE_ON_DEMAND is set.
+"""
+# 70 characters stops here ----------------------------------------> |
+
+# CBMC prints these messages at the end of a run.  The merged result
+# replaces them with messages summarizing all shards.
+_SUMMARY_PREFIXES = ["** ", "VERIFICATION "]
+
+
+def get_args():
+    pars = argparse.ArgumentParser(
+        description=DESCRIPTION, epilog=EPILOG,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    subs = pars.add_subparsers(dest="subcommand", required=True)
+
+    run_parser = subs.add_parser(
+        "run", help="check one shard of the properties of a proof")
+    for arg in [{
+            "flags": ["--properties"],
+            "metavar": "FILE",
+            "required": True,
+            "help": "output of cbmc --show-properties --xml-ui",
+    }, {
+            "flags": ["--shard"],
+            "metavar": "I/N",
+            "required": True,
+            "type": parse_shard,
+            "help": "check shard I of N (counting from 1)",
+    }, {
+            "flags": ["command"],
+            "metavar": "-- COMMAND",
+            "nargs": argparse.REMAINDER,
+            "help": "the CBMC command that checks the properties",
+    }]:
+        flags = arg.pop("flags")
+        run_parser.add_argument(*flags, **arg)
+
+    merge_parser = subs.add_parser(
+        "merge", help="merge the XML results of the shards of a proof")
+    merge_parser.add_argument(
+        "results", metavar="FILE", nargs="+",
+        help="output of cbmc --xml-ui for one shard")
+
+    traces_parser = subs.add_parser(
+        "traces", help="add the traces of the failed properties to a result")
+    for arg in [{
+            "flags": ["--result"],
+            "metavar": "FILE",
+            "required": True,
+            "help": "output of cbmc --xml-ui without --trace",
+    }, {
+            "flags": ["--jobs"],
+            "metavar": "N",
+            "type": int,
+            "default": 1,
+            "help": (
+                "run up to N CBMC commands in parallel. "
+                "Default: %(default)s"),
+    }, {
+            "flags": ["command"],
+            "metavar": "-- COMMAND",
+            "nargs": argparse.REMAINDER,
+            "help": "the CBMC command with --trace that checks the properties",
+    }]:
+        flags = arg.pop("flags")
+        traces_parser.add_argument(*flags, **arg)
+
+    args = pars.parse_args()
+    if args.subcommand in ["run", "traces"]:
+        if args.command and args.command[0] == "--":
+            args.command = args.command[1:]
+        if not args.command:
+            pars.error("no command given")
+    return args
+
+
+def parse_shard(string):
+    index, _, count = string.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        index, count = 0, 0
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(
+            f"invalid shard '{string}': expected I/N with 1 <= I <= N")
+    return index, count
+
+
+################################################################
+# Running one shard
+
+
+def property_names(property_file):
+    """The names of the properties listed in property_file."""
+
+    root = ET.parse(property_file).getroot()
+    return [prop.get("name") for prop in root.iter("property")]
+
+
+def shard_properties(names, index, count):
+    """The properties in shard index of count.
+
+    Properties are dealt out to the shards in turn, so that properties
+    of the same function, which tend to be equally hard, are spread over
+    all shards.
+    """
+
+    return names[index - 1::count]
+
+
+def run(args):
+    names = shard_properties(
+        property_names(args.properties), *args.shard)
+    if not names:
+        # There are more shards than properties
+        sys.stdout.buffer.write(_serialize(_result_document(None, [], [])))
+        return 0
+
+    flags = [word for name in names for word in ["--property", name]]
+    logging.debug(" ".join(args.command + flags))
+    return subprocess.run(args.command + flags, check=False).returncode
+
+
+################################################################
+# Merging the shards
+
+
+def _result_document(program, messages, results):
+    root = ET.Element("cprover")
+    if program is not None:
+        root.append(program)
+    root.extend(messages)
+    root.extend(results)
+
+    failed = [
+        result for result in results if result.get("status") == "FAILURE"]
+    for text in [
+            f"** {len(failed)} of {len(results)} failed",
+            "VERIFICATION FAILED" if failed else "VERIFICATION SUCCESSFUL"]:
+        message = ET.SubElement(root, "message", type="STATUS-MESSAGE")
+        ET.SubElement(message, "text").text = text
+    ET.SubElement(root, "cprover-status").text = (
+        "FAILURE" if failed else "SUCCESS")
+    return root
+
+
+def _is_summary(message):
+    text = message.findtext("text") or ""
+    return any(text.startswith(prefix) for prefix in _SUMMARY_PREFIXES)
+
+
+def merge_results(roots):
+    """Merge the roots of the XML results of the shards into one root.
+
+    Each message printed by more than one shard appears once.  Each
+    property checked by more than one shard appears once, too: CBMC adds
+    some properties during symbolic execution, like the unwinding
+    assertions, which --property does not select, so every shard checks
+    them.  The result kept for such a property is a failure if any shard
+    reports a failure, and a result other than a success otherwise.
+    """
+
+    program = None
+    messages = []
+    seen = set()
+    results = {}
+    for root in roots:
+        for element in root:
+            if element.tag == "program" and program is None:
+                program = element
+            elif element.tag == "message" and not _is_summary(element):
+                key = (element.get("type"), "".join(element.itertext()))
+                if key not in seen:
+                    seen.add(key)
+                    messages.append(element)
+            elif element.tag == "result":
+                name = element.get("property")
+                if (name not in results or
+                        _status_rank(element) > _status_rank(results[name])):
+                    results[name] = element
+    return _result_document(program, messages, list(results.values()))
+
+
+def _status_rank(result):
+    status = result.get("status")
+    if status == "FAILURE":
+        return 2
+    return 0 if status == "SUCCESS" else 1
+
+
+def _serialize(root):
+    return ET.tostring(root, encoding="UTF-8", xml_declaration=True) + b"\n"
+
+
+def merge(args):
+    roots = []
+    for result in args.results:
+        try:
+            roots.append(ET.parse(result).getroot())
+        except (OSError, ET.ParseError) as error:
+            logging.critical("Could not read CBMC result %s: %s", result, error)
+            return 1
+    root = merge_results(roots)
+    sys.stdout.buffer.write(_serialize(root))
+    return 10 if root.findtext("cprover-status") == "FAILURE" else 0
+
+
+################################################################
+# Adding traces of failed properties
+
+
+def failed_properties(root):
+    return [
+        result.get("property") for result in root.iter("result")
+        if result.get("status") == "FAILURE"]
+
+
+def _traced_results(command, names):
+    """The results with traces of a CBMC command checking names, or None."""
+
+    flags = [word for name in names for word in ["--property", name]]
+    logging.debug(" ".join(command + flags))
+    proc = subprocess.run(
+        command + flags, stdout=subprocess.PIPE, check=False)
+    if proc.returncode not in [0, 10]:
+        logging.warning(
+            "CBMC returned %d reproducing traces of %s",
+            proc.returncode, ", ".join(names))
+        return None
+    try:
+        root = ET.fromstring(proc.stdout)
+    except ET.ParseError as error:
+        logging.warning("Could not read CBMC result with traces: %s", error)
+        return None
+    return [
+        result for result in root.iter("result")
+        if result.find("goto_trace") is not None]
+
+
+def add_traces(root, traced):
+    """Replace each result in root with the result in traced for its property."""
+
+    for idx, element in enumerate(root):
+        if element.tag == "result" and element.get("property") in traced:
+            root[idx] = traced[element.get("property")]
+    return root
+
+
+def traces(args):
+    try:
+        root = ET.parse(args.result).getroot()
+    except (OSError, ET.ParseError) as error:
+        logging.critical("Could not read CBMC result %s: %s", args.result, error)
+        return 1
+
+    failed = failed_properties(root)
+    if failed:
+        count = max(1, min(args.jobs, len(failed)))
+        shards = [
+            shard_properties(failed, index, count)
+            for index in range(1, count + 1)]
+        traced = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=count) as pool:
+            for results in pool.map(
+                    lambda names: _traced_results(args.command, names), shards):
+                for result in results or []:
+                    traced[result.get("property")] = result
+        root = add_traces(root, traced)
+
+    sys.stdout.buffer.write(_serialize(root))
+    return 10 if root.findtext("cprover-status") == "FAILURE" else 0
+
+
+def main():
+    args = get_args()
+    logging.basicConfig(format="property_shards.py: %(message)s")
+
+    if args.subcommand == "run":
+        sys.exit(run(args))
+    if args.subcommand == "merge":
+        sys.exit(merge(args))
+    if args.subcommand == "traces":
+        sys.exit(traces(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+
+
+DESCRIPTION = """Run cbmc-viewer to render the report of a proof only when
+the report is needed."""
+
+# Keep the epilog hard-wrapped at 70 characters, as it gets printed
+# verbatim in the terminal. 70 characters stops here --------------> |
+EPILOG = """
+The command after -- is the cbmc-viewer command that writes the report
+of a proof to REPORTDIR.
+
+With --changed, the command runs only if the inputs of the report or
+the command itself have changed since the report in REPORTDIR was
+written, and the existing report is kept otherwise.  The inputs are
+compared by content, through a digest that is written to
+REPORTDIR/report-inputs.json along with the report.
+
+With --failing, the command runs only if RESULT shows that a property
+failed or that CBMC did not finish.  Otherwise, the report is replaced
+with a stub page in REPORTDIR/html/index.html that says that no
+property failed.  Running `make report` in the proof directory
+without REPORT_POLICY renders the full report of the proof.
+
+Makefile.common runs the report job of each proof through this script
+if REPORT_POLICY is set.
+"""
+# 70 characters stops here ----------------------------------------> |
+
+# The digest of the inputs of the report, relative to the report directory
+_STAMP = "report-inputs.json"
+
+_STUB = """<!DOCTYPE html>
+<html>
+<head><title>CBMC</title></head>
+<body>
+<h1>CBMC report</h1>
+<p>No property of this proof failed, so the full report was not
+rendered.  Run <code>make report</code> in the proof directory to
+render it.</p>
+</body>
+</html>
+"""
+
+
+def get_args():
+    pars = argparse.ArgumentParser(
+        description=DESCRIPTION, epilog=EPILOG,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    for arg in [{
+            "flags": ["--reportdir"],
+            "required": True,
+            "metavar": "REPORTDIR",
+            "help": "directory the command writes the report to",
+    }, {
+            "flags": ["--result"],
+            "required": True,
+            "metavar": "RESULT",
+            "help": "output of cbmc --xml-ui checking the proof",
+    }, {
+            "flags": ["--inputs"],
+            "nargs": "*",
+            "default": [],
+            "metavar": "FILE",
+            "help": "files the report is rendered from",
+    }, {
+            "flags": ["--changed"],
+            "action": "store_true",
+            "help": "keep the existing report if its inputs have not changed",
+    }, {
+            "flags": ["--failing"],
+            "action": "store_true",
+            "help": "write a stub page instead of the report if no "
+                    "property failed",
+    }, {
+            "flags": ["command"],
+            "nargs": argparse.REMAINDER,
+            "help": "cbmc-viewer command, after --",
+    }]:
+        flags = arg.pop("flags")
+        pars.add_argument(*flags, **arg)
+    args = pars.parse_args()
+    if args.command[:1] == ["--"]:
+        args.command = args.command[1:]
+    if not args.command:
+        pars.error("no command given")
+    return args
+
+
+################################################################
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _tool_identity(tool):
+    path = shutil.which(tool)
+    if path is None:
+        return None
+    stat = pathlib.Path(path).resolve().stat()
+    return f"{path}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def report_key(command, inputs, stub):
+    """Digest of everything the report in the report directory depends on."""
+
+    digests = {}
+    for path in inputs:
+        try:
+            digests[path] = _file_digest(path)
+        except OSError:
+            digests[path] = None
+    blob = json.dumps({
+        "command": command,
+        "tool": _tool_identity(command[0]),
+        "inputs": digests,
+        "stub": stub,
+    }, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def proof_failed(result):
+    """Whether result fails to show that every property holds."""
+
+    try:
+        status = ET.parse(result).getroot().findtext("cprover-status")
+    except (OSError, ET.ParseError):
+        return True
+    return status != "SUCCESS"
+
+
+################################################################
+
+
+def load_key(reportdir):
+    try:
+        with open(reportdir / _STAMP, encoding="utf-8") as handle:
+            return json.load(handle).get("key")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def save_key(reportdir, key):
+    with open(reportdir / _STAMP, "w", encoding="utf-8") as handle:
+        json.dump({"key": key}, handle)
+
+
+def write_stub(reportdir):
+    shutil.rmtree(reportdir, ignore_errors=True)
+    (reportdir / "html").mkdir(parents=True)
+    (reportdir / "html" / "index.html").write_text(_STUB, encoding="utf-8")
+
+
+def main():
+    args = get_args()
+    logging.basicConfig(format="report_policy.py: %(message)s")
+
+    reportdir = pathlib.Path(args.reportdir)
+    stub = args.failing and not proof_failed(args.result)
+    key = report_key(args.command, args.inputs, stub)
+
+    if (args.changed and load_key(reportdir) == key and
+            (reportdir / "html" / "index.html").exists()):
+        print(f"Keeping the report in {reportdir}: its inputs have not changed")
+        return
+
+    try:
+        os.unlink(reportdir / _STAMP)
+    except FileNotFoundError:
+        pass
+
+    if stub:
+        print(f"Writing a stub report to {reportdir}: no property failed")
+        write_stub(reportdir)
+    else:
+        proc = subprocess.run(args.command, check=False)
+        if proc.returncode:
+            sys.exit(proc.returncode)
+    try:
+        save_key(reportdir, key)
+    except OSError as error:
+        logging.warning("Could not record the inputs of the report: %s", error)
+
+
+if __name__ == "__main__":
+    main()
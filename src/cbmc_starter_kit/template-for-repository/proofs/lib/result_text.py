@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import argparse
+import logging
+import sys
+import xml.etree.ElementTree as ET
+
+
+DESCRIPTION = """Print the XML result of a CBMC run as the text that CBMC
+prints without --xml-ui."""
+
+# Keep the epilog hard-wrapped at 70 characters, as it gets printed
+# verbatim in the terminal. 70 characters stops here --------------> |
+EPILOG = """
+The result is the output of cbmc --trace --xml-ui.  The messages and
+the status of each property are printed in the layout that cbmc
+--trace uses.  If the output of cbmc --show-properties --xml-ui is
+given, too, the status of each property is printed with the location
+and description of the property.
+
+The trace of each failed property is printed as a summary of the trace
+that cbmc --trace prints: the states with their assignments, and the
+location and description of the violated property.  The summary leaves
+out the binary values of the assignments, the expression of the
+violated property, and the inputs and outputs of the program.
+
+The script returns 10 if a property failed, like CBMC does, and 0 if
+no property failed.
+
+Makefile.common writes result.txt this way, so that a proof checked
+for both result.xml and result.txt runs CBMC only once.
+"""
+# 70 characters stops here ----------------------------------------> |
+
+# The CBMC return code when a property fails
+_VERIFICATION_FAILED = 10
+
+# The line under the header of each state in a trace
+_STATE_RULE = "-" * 52
+
+
+def get_args():
+    pars = argparse.ArgumentParser(
+        description=DESCRIPTION, epilog=EPILOG,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    for arg in [{
+            "flags": ["result"],
+            "metavar": "RESULT",
+            "help": "output of cbmc --trace --xml-ui",
+    }, {
+            "flags": ["--properties"],
+            "metavar": "FILE",
+            "help": "output of cbmc --show-properties --xml-ui",
+    }]:
+        flags = arg.pop("flags")
+        pars.add_argument(*flags, **arg)
+    return pars.parse_args()
+
+
+################################################################
+# Properties
+
+
+def load_properties(property_file):
+    """Map the name of each property in property_file to its details."""
+
+    if property_file is None:
+        return {}
+    root = ET.parse(property_file).getroot()
+    properties = {}
+    for prop in root.iter("property"):
+        location = prop.find("location")
+        location = {} if location is None else location.attrib
+        properties[prop.get("name")] = {
+            "file": location.get("file"),
+            "function": location.get("function"),
+            "line": location.get("line"),
+            "description": prop.findtext("description"),
+        }
+    return properties
+
+
+################################################################
+# Rendering
+
+
+def _location(element):
+    location = element.find("location")
+    if location is None:
+        return ""
+    words = []
+    for name in ["file", "function", "line"]:
+        if location.get(name) is not None:
+            words.extend([name, location.get(name)])
+    words.extend(["thread", element.get("thread", "0")])
+    return " ".join(words)
+
+
+def render_trace(name, trace):
+    """A summary of the trace that cbmc --trace prints for property name.
+
+    Consecutive assignments of the same step are printed under a single
+    state header, as CBMC prints them.
+    """
+
+    lines = ["", f"Trace for {name}:"]
+    state = None
+    for step in trace:
+        if step.get("hidden") == "true":
+            continue
+        if step.tag == "assignment":
+            if step.get("step_nr") != state:
+                state = step.get("step_nr")
+                lines.extend([
+                    "", f"State {state} {_location(step)}", _STATE_RULE])
+            lines.append(
+                f"  {step.findtext('full_lhs')}="
+                f"{step.findtext('full_lhs_value')}")
+        elif step.tag == "failure":
+            lines.extend([
+                "", "Violated property:", f"  {_location(step)}",
+                f"  {step.get('reason')}"])
+    lines.append("")
+    return lines
+
+
+def render_results(results, properties):
+    lines = ["", "** Results:"]
+    group = None
+    for result in results:
+        name = result.get("property")
+        prop = properties.get(name, {})
+        if prop.get("file") and (prop["file"], prop["function"]) != group:
+            group = (prop["file"], prop["function"])
+            lines.append(f"{prop['file']} function {prop['function']}")
+        words = [f"[{name}]"]
+        if prop.get("line"):
+            words.extend(["line", prop["line"]])
+        if prop.get("description"):
+            words.append(prop["description"])
+        lines.append(f"{' '.join(words)}: {result.get('status')}")
+
+    for result in results:
+        trace = result.find("goto_trace")
+        if result.get("status") == "FAILURE" and trace is not None:
+            lines.extend(render_trace(result.get("property"), trace))
+    return lines
+
+
+def render(root, properties):
+    """The lines of text for the XML result root, as CBMC prints them.
+
+    The traces are summarized as render_trace does.
+    """
+
+    lines = []
+    results = []
+    for element in root:
+        if element.tag == "result":
+            results.append(element)
+            continue
+        if results:
+            lines.extend(render_results(results, properties))
+            results = []
+        if element.tag == "program":
+            lines.append(element.text or "")
+        elif element.tag == "message":
+            text = element.findtext("text") or ""
+            if element.get("type") == "WARNING":
+                text = f"**** WARNING: {text}"
+            elif element.get("type") == "ERROR":
+                text = f"**** ERROR: {text}"
+            lines.append(text)
+    if results:
+        lines.extend(render_results(results, properties))
+    return lines
+
+
+def main():
+    args = get_args()
+    logging.basicConfig(format="result_text.py: %(message)s")
+
+    try:
+        root = ET.parse(args.result).getroot()
+        properties = load_properties(args.properties)
+    except (OSError, ET.ParseError) as error:
+        logging.critical("Could not read CBMC result: %s", error)
+        sys.exit(1)
+
+    print("\n".join(render(root, properties)))
+    status = root.findtext("cprover-status")
+    if status == "FAILURE":
+        sys.exit(_VERIFICATION_FAILED)
+    if status != "SUCCESS":
+        logging.critical("CBMC result %s has no verification status", args.result)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ import logging
 import os
 import sys
 
+from litani_jobs import RUN_PIPELINES
+
 
 DESCRIPTION = """Print 2 tables in GitHub-flavored Markdown that summarize
 an execution of CBMC proofs."""
@@ -86,7 +88,7 @@ def _get_status_and_proof_summaries(run_dict):
     count_statuses = {}
     proofs = [["Proof", "Status"]]
     for proof_pipeline in run_dict["pipelines"]:
-        if proof_pipeline["name"] == "print_tool_versions":
+        if proof_pipeline["name"] in RUN_PIPELINES:
             continue
         status_pretty_name = proof_pipeline["status"].title().replace("_", " ")
         try:
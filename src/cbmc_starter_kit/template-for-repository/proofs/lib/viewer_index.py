@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import argparse
+import json
+import logging
+import os
+import pathlib
+import re
+import sys
+
+
+DESCRIPTION = """Write the source and symbol index that cbmc-viewer builds
+for a source tree."""
+
+# Keep the epilog hard-wrapped at 70 characters, as it gets printed
+# verbatim in the terminal. 70 characters stops here --------------> |
+EPILOG = """
+Each time cbmc-viewer builds a report, it lists the source files under
+the source root and tags the symbols they define.  This script does
+the same once for the whole source tree, and writes the results to
+viewer-source.json and viewer-symbol.json in the output directory.
+cbmc-viewer reads these files with --viewer-source and --viewer-symbol
+instead of scanning the source tree again.
+
+The symbols are tagged with the ctags support of the cbmc-starter-kit
+package, which must be installed.  With --tag-index, the tags of each
+file are kept in a persistent index, and only the files that have
+changed since the index was written are tagged again.
+
+The files are selected as cbmc-viewer selects them with --exclude and
+--extensions, so the index must be written with the same --exclude as
+the report that reads it.  A directory whose path followed by a slash
+matches --exclude is not searched at all.
+
+run-cbmc-proofs.py --viewer-index runs this script once for each
+source root and VIEWER_EXCLUDE of the proofs, and Makefile.common
+passes the index to the report job of each proof.
+"""
+# 70 characters stops here ----------------------------------------> |
+
+# The source files that cbmc-viewer lists by default
+_EXTENSIONS = r"^\.(c|h|inl)$"
+
+
+def get_args():
+    pars = argparse.ArgumentParser(
+        description=DESCRIPTION, epilog=EPILOG,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    for arg in [{
+            "flags": ["--srcdir"],
+            "required": True,
+            "metavar": "DIR",
+            "help": "root of the source tree",
+    }, {
+            "flags": ["--output-dir"],
+            "required": True,
+            "metavar": "DIR",
+            "help": "directory to write viewer-source.json and "
+                    "viewer-symbol.json to",
+    }, {
+            "flags": ["--tag-index"],
+            "metavar": "FILE",
+            "help": "persistent index of the tags of each source file",
+    }, {
+            "flags": ["--exclude"],
+            "metavar": "REGEXP",
+            "help": "paths relative to DIR to leave out of the index",
+    }, {
+            "flags": ["--extensions"],
+            "metavar": "REGEXP",
+            "default": _EXTENSIONS,
+            "help": "extensions of the files to index. Default: %(default)s",
+    }, {
+            "flags": ["--verbose"],
+            "action": "store_true",
+            "help": "verbose output",
+    }]:
+        flags = arg.pop("flags")
+        pars.add_argument(*flags, **arg)
+    return pars.parse_args()
+
+
+################################################################
+# Sources
+
+
+def source_files(root, exclude=None, extensions=_EXTENSIONS):
+    """The paths relative to root of the source files under root.
+
+    The files are selected the way cbmc-viewer selects them: by matching
+    exclude against the relative path and extensions against the file
+    extension, ignoring case.  Every path under a directory matches
+    exclude if the path of the directory followed by a slash does, so
+    the directory is not searched.
+    """
+
+    files = []
+    for path, dirs, names in os.walk(root, followlinks=True):
+        relpath = os.path.relpath(path, root)
+        if exclude is not None:
+            dirs[:] = [
+                name for name in dirs if not re.match(
+                    exclude, os.path.normpath(os.path.join(relpath, name)) + "/",
+                    re.I)]
+        for name in names:
+            files.append(os.path.normpath(os.path.join(relpath, name)))
+    if exclude is not None:
+        files = [
+            path for path in files if not re.match(exclude, path, re.I)]
+    return sorted(
+        path for path in files
+        if re.match(extensions, os.path.splitext(path)[1], re.I))
+
+
+def viewer_source(root, files):
+    return {"viewer-source": {
+        "root": str(root),
+        "files": list(files),
+        "all_files": [str(pathlib.Path(root, path)) for path in files],
+    }}
+
+
+################################################################
+# Symbols
+
+
+def viewer_symbol(root, tags):
+    """Map each symbol in tags to the location of its definition.
+
+    A symbol defined more than once is mapped to the first definition in
+    the order of file and line, as cbmc-viewer does.  ctags does not name
+    the function a definition appears in, so the function of each
+    location is None, as in the symbol table cbmc-viewer builds with ctags.
+
+    The symbols are not wrapped in a "symbols" entry as in the symbol
+    table that cbmc-viewer writes, because cbmc-viewer --viewer-symbol
+    reads the table as a plain map from symbol to location.
+    """
+
+    symbols = {}
+    tags = sorted(
+        tags, key=lambda tag: (tag["symbol"], str(tag["file"]), tag["line"]))
+    for tag in tags:
+        if tag["symbol"] in symbols:
+            continue
+        symbols[tag["symbol"]] = {
+            "file": os.path.relpath(tag["file"], root),
+            "function": None,
+            "line": int(tag["line"]),
+        }
+    return {"viewer-symbol": symbols}
+
+
+def tag_files(root, files, tag_index=None):
+    # The ctags support is part of the starter kit package, and is not
+    # copied into the proof library of the repository.
+    try:
+        # pylint: disable=import-outside-toplevel
+        from cbmc_starter_kit import ctagst
+    except ImportError as error:
+        raise UserWarning(
+            "the cbmc-starter-kit package is not installed") from error
+
+    if tag_index is not None:
+        return ctagst.indexed_ctags(root, files, tag_index)
+    tags = ctagst.try_ctags(root, files)
+    if tags is None:
+        raise UserWarning("ctags failed")
+    return tags
+
+
+################################################################
+
+
+def write_json(path, data):
+    tmp_file = f"{path}.{os.getpid()}"
+    with open(tmp_file, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, indent=2, sort_keys=True)
+    os.replace(tmp_file, path)
+
+
+def main():
+    args = get_args()
+    logging.basicConfig(
+        format="viewer_index.py: %(message)s",
+        level=logging.INFO if args.verbose else logging.WARNING)
+
+    root = pathlib.Path(args.srcdir).resolve()
+    output_dir = pathlib.Path(args.output_dir)
+    try:
+        files = source_files(root, args.exclude, args.extensions)
+        symbols = viewer_symbol(root, tag_files(root, files, args.tag_index))
+        output_dir.mkdir(parents=True, exist_ok=True)
+        write_json(output_dir / "viewer-source.json", viewer_source(root, files))
+        write_json(output_dir / "viewer-symbol.json", symbols)
+    except (OSError, UserWarning) as error:
+        logging.critical("Could not index %s: %s", root, error)
+        sys.exit(1)
+    print(
+        f"Indexed {len(symbols['viewer-symbol'])} symbols in "
+        f"{len(files)} files under {root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,18 +6,37 @@
 
 import argparse
 import asyncio
+import hashlib
+import importlib.util
 import json
 import logging
 import math
 import os
 import pathlib
 import re
+import shlex
+import shutil
 import subprocess
 import sys
 import tempfile
 import uuid
 
-from lib.summarize import print_proof_results
+# The modules in lib are also run as scripts, and import each other as
+# top-level modules, so import them the same way here.
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent / "lib"))
+
+# pylint: disable=wrong-import-position
+from cache import parse_size
+from dependencies import affected_proofs, changed_files, proof_dependencies
+from discovery import proof_dirs as proof_directories
+from history import (
+    expected_durations, load_history, longest_proofs, partition,
+    update_history)
+from litani_jobs import (
+    add_jobs, failed_outputs, job_dict, read_jobs, recorder)
+from manifest import litani_capabilities, project_variables, proof_manifest
+from summarize import print_proof_results
+# pylint: enable=wrong-import-position
 
 
 DESCRIPTION = "Configure and run all CBMC proofs in parallel"
@@ -66,26 +85,42 @@ your browser and reload the page whenever you re-run this script.
 """
 # 70 characters stops here ----------------------------------------> |
 
+# The Litani pool of the CBMC jobs of the proofs that --longest-first
+# does not give priority
+CHECK_POOL = "shorter-proofs"
 
-def get_project_name():
-    cmd = [
-        "make",
-        "--no-print-directory",
-        "-f", "Makefile.common",
-        "echo-project-name",
-    ]
-    logging.debug(" ".join(cmd))
-    proc = subprocess.run(cmd, universal_newlines=True, stdout=subprocess.PIPE, check=False)
-    if proc.returncode:
-        logging.critical("could not run make to determine project name")
+
+def get_manifest_file(proof_root):
+    return pathlib.Path(proof_root) / "output" / "proof-manifest.json"
+
+
+def get_project_variables(proof_root):
+    try:
+        variables = project_variables(proof_root, get_manifest_file(proof_root))
+    except UserWarning as error:
+        logging.debug("%s", error)
+        logging.critical("could not run make to determine project variables")
         sys.exit(1)
-    if not proc.stdout.strip():
+
+    # Strip the quotes from values like PROJECT_NAME = "my project", as the
+    # shell did when these values were printed with echo by make
+    def unquote(value):
+        try:
+            return " ".join(shlex.split(value))
+        except ValueError:
+            return value
+    return {name: unquote(value) for name, value in variables.items()}
+
+
+def get_project_name(proof_root):
+    name = get_project_variables(proof_root)["PROJECT_NAME"]
+    if not name:
         logging.warning(
             "project name has not been set; using generic name instead. "
             "Set the PROJECT_NAME value in Makefile-project-defines to "
             "remove this warning")
         return "<PROJECT NAME HERE>"
-    return proc.stdout.strip()
+    return name
 
 
 def get_args():
@@ -114,8 +149,9 @@ def get_args():
     }, {
             "flags": ["--project-name"],
             "metavar": "NAME",
-            "default": get_project_name(),
-            "help": "project name for report. Default: %(default)s",
+            "help": (
+                "project name for report. Default: PROJECT_NAME in "
+                "Makefile-project-defines"),
     }, {
             "flags": ["--marker-file"],
             "metavar": "FILE",
@@ -160,6 +196,110 @@ def get_args():
             "flags": ["--no-coverage"],
             "action": "store_true",
             "help": "do property checking without coverage checking"
+    }, {
+            "flags": ["--coverage-policy"],
+            "nargs": "+",
+            "choices": ["changed", "deferred"],
+            "default": [],
+            "help": (
+                "'changed': reuse the coverage of a proof from an earlier run "
+                "if its goto binary has not changed. 'deferred': compute "
+                "coverage at low priority after the safety checks of all "
+                "proofs are done"),
+    }, {
+            "flags": ["--build-cache"],
+            "action": "store_true",
+            "help": (
+                "restore goto binaries from a local cache instead of "
+                "rebuilding them when their inputs have not changed"),
+    }, {
+            "flags": ["--object-store"],
+            "action": "store_true",
+            "help": (
+                "compile each project source file once for all proofs that "
+                "compile it with the same flags, and link the goto objects "
+                "into the project binary of each proof"),
+    }, {
+            "flags": ["--result-cache"],
+            "action": "store_true",
+            "help": (
+                "restore CBMC results from a local cache instead of running "
+                "CBMC when the goto binary and CBMC flags have not changed"),
+    }, {
+            "flags": ["--incremental"],
+            "action": "store_true",
+            "help": (
+                "add only the jobs whose outputs from the previous run are "
+                "out of date with the sources, headers, and makefiles they "
+                "are built from, or that failed in the previous run, instead "
+                "of rebuilding everything"),
+    }, {
+            "flags": ["--fused-pipeline"],
+            "action": "store_true",
+            "help": (
+                "build each proof harness with fewer goto-instrument jobs, "
+                "leaving out the jobs that only copy a goto binary"),
+    }, {
+            "flags": ["--changed-since"],
+            "metavar": "REV",
+            "help": (
+                "run only the proofs that depend on a file that has changed "
+                "since git revision REV, including uncommitted changes. The "
+                "files each proof depends on are written to "
+                "output/dependency-index.json"),
+    }, {
+            "flags": ["--trace-on-demand"],
+            "action": "store_true",
+            "help": (
+                "check the properties of each proof without traces, and "
+                "reproduce the traces of just the failed properties in a "
+                "second job"),
+    }, {
+            "flags": ["--viewer-index"],
+            "action": "store_true",
+            "help": (
+                "list the source files and tag the symbols of the source "
+                "tree once for all reports, instead of once in every "
+                "cbmc-viewer job. Needs the cbmc-starter-kit package"),
+    }, {
+            "flags": ["--report-policy"],
+            "nargs": "+",
+            "choices": ["changed", "failing"],
+            "default": [],
+            "help": (
+                "'changed': keep the report of a proof from an earlier run "
+                "if the results, coverage, and goto binary it is rendered "
+                "from have not changed. 'failing': render the full report "
+                "only for proofs with a failed property, and a stub page "
+                "for the others"),
+    }, {
+            "flags": ["--memory-budget"],
+            "metavar": "SIZE",
+            "type": parse_size,
+            "help": (
+                "run the CBMC jobs of all proofs within a total memory budget "
+                "of SIZE (like 64G), admitting each job when its predicted "
+                "peak memory use fits. This replaces the limit on the number "
+                "of expensive jobs"),
+    }, {
+            "flags": ["--shard"],
+            "metavar": "I/N",
+            "type": parse_shard,
+            "help": (
+                "split the proofs into N shards with about the same expected "
+                "duration, and run only the proofs in shard I (counting "
+                "from 1). Every shard must see the same proofs and the same "
+                "output/proof-history.json for the shards to be disjoint. "
+                "Combine the output/run.json files of the shards with "
+                "lib/merge_runs.py"),
+    }, {
+            "flags": ["--longest-first"],
+            "action": "store_true",
+            "help": (
+                "keep job slots free for the CBMC jobs of the proofs that "
+                "took longest in previous runs, so that they start as soon "
+                "as their goto binaries are built. Needs a Litani with job "
+                "pools"),
     }]:
         flags = arg.pop("flags")
         pars.add_argument(*flags, **arg)
@@ -189,104 +329,219 @@ def print_counter(counter):
 
 
 def get_proof_dirs(proof_root, proof_list, marker_file):
+    index_file = proof_root / "output" / "proof-dirs.json"
+    proof_dirs = proof_directories(proof_root, marker_file, index_file)
+
+    # Remove stale Litani cache markers left in proof directories (and the
+    # directories between them and the proof root) by `make report`, so
+    # that jobs are not added to the run those markers point to.
+    for proof_dir in proof_dirs:
+        path = pathlib.Path(proof_dir)
+        while path != proof_root and proof_root in path.parents:
+            (path / ".litani_cache_dir").unlink(missing_ok=True)
+            path = path.parent
+
     if proof_list is not None:
-        proofs_remaining = list(proof_list)
-    else:
-        proofs_remaining = []
-
-    for root, _, fyles in os.walk(proof_root):
-        proof_name = str(pathlib.Path(root).name)
-        if root != str(proof_root) and ".litani_cache_dir" in fyles:
-            pathlib.Path(f"{root}/.litani_cache_dir").unlink()
-        if proof_list and proof_name not in proof_list:
-            continue
-        if proof_list and proof_name in proofs_remaining:
-            proofs_remaining.remove(proof_name)
-        if marker_file in fyles:
-            yield root
-
-    if proofs_remaining:
-        logging.critical(
-            "The following proofs were not found: %s",
-            ", ".join(proofs_remaining))
+        proofs_remaining = set(proof_list)
+        proof_dirs = [
+            proof_dir for proof_dir in proof_dirs
+            if pathlib.Path(proof_dir).name in proof_list]
+        proofs_remaining -= {
+            pathlib.Path(proof_dir).name for proof_dir in proof_dirs}
+        if proofs_remaining:
+            logging.critical(
+                "The following proofs were not found: %s",
+                ", ".join(sorted(proofs_remaining)))
+            sys.exit(1)
+
+    return proof_dirs
+
+
+def select_affected_proofs(proof_root, proof_dirs, manifest, rev):
+    """The proofs in proof_dirs that depend on a file changed since rev.
+
+    The make variables that the dependencies of each proof are computed
+    from are read from the manifest.
+    """
+
+    try:
+        changed = changed_files(rev, proof_root)
+    except UserWarning as error:
+        logging.critical("%s", error)
         sys.exit(1)
 
+    index = proof_dependencies(
+        {proof_dir: manifest[proof_dir] for proof_dir in proof_dirs})
+    index_file = proof_root / "output" / "dependency-index.json"
+    index_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(index_file, "w", encoding="utf-8") as handle:
+        json.dump(index, handle, indent=2)
+    logging.debug("Wrote proof dependencies to %s", index_file)
+
+    affected = set(affected_proofs(index, changed))
+    return [proof_dir for proof_dir in proof_dirs if str(proof_dir) in affected]
+
+
+def get_expected_durations(proof_dirs, manifest, history_file):
+    """Map each proof directory to the expected duration of its proof.
+
+    The expected durations come from previous runs. Proofs that have never
+    run are estimated by whether they set EXPENSIVE. The expected durations
+    balance the shards selected with --shard and pick the proofs that
+    --longest-first gives priority.
+    """
+
+    uids = {
+        proof_dir: manifest[proof_dir]["PROOF_UID"] for proof_dir in proof_dirs
+    }
+    expensive = {
+        uids[proof_dir] for proof_dir in proof_dirs
+        if manifest[proof_dir]["EXPENSIVE"]
+    }
+    expected = expected_durations(
+        list(uids.values()), load_history(history_file), expensive)
+    for proof_dir in proof_dirs:
+        logging.debug(
+            "Expected duration of %s: %ss", uids[proof_dir],
+            expected[uids[proof_dir]])
+    return {proof_dir: expected[uids[proof_dir]] for proof_dir in proof_dirs}
+
+
+def get_check_pool(expected, parallel_jobs):
+    """The pool for the CBMC jobs of all but the longest proofs.
+
+    Litani hands all jobs to ninja at once, and ninja chooses which ready
+    job to run next by itself, so the order in which jobs are added does
+    not give the longest proofs priority.  Instead, the CBMC jobs of the
+    other proofs are limited to a pool with one slot fewer than the run
+    for each of the longest proofs.  Returns the proofs outside the pool
+    and the depth of the pool, or no proofs if none need priority.
+    """
+
+    parallelism = parallel_jobs or os.cpu_count() or 1
+    longest = longest_proofs(expected, parallelism)
+    for proof_dir in longest:
+        logging.debug(
+            "Keeping a job slot for %s (expected duration %ss)",
+            proof_dir, expected[proof_dir])
+    return longest, parallelism - len(longest)
 
-def run_build(litani, jobs, fail_on_proof_failure, summarize):
-    cmd = [str(litani), "run-build"]
+
+def parse_shard(string):
+    match = re.match(r"^(?P<index>\d+)/(?P<count>\d+)$", string)
+    if not match or not 1 <= int(match["index"]) <= int(match["count"]):
+        raise argparse.ArgumentTypeError(
+            f"invalid shard '{string}': expected I/N with 1 <= I <= N")
+    return int(match["index"]), int(match["count"])
+
+
+def select_shard(proof_dirs, expected, shard):
+    index, count = shard
+    shards = partition(
+        {proof_dir: expected[proof_dir] for proof_dir in proof_dirs}, count)
+    for number, proofs in enumerate(shards, start=1):
+        logging.debug(
+            "Shard %d/%d: %d proofs, expected duration %ss", number, count,
+            len(proofs), sum(expected[proof] for proof in proofs))
+    return shards[index - 1]
+
+
+def remove_failed_outputs(run_file):
+    """Remove the outputs of the jobs that failed in the previous run.
+
+    Without its output, make adds a failed job to an incremental run again.
+    """
+
+    try:
+        with open(run_file, encoding="utf-8") as handle:
+            outputs = failed_outputs(json.load(handle))
+    except FileNotFoundError:
+        return
+    except (OSError, KeyError, json.decoder.JSONDecodeError) as error:
+        logging.warning("Could not read failed jobs from %s: %s", run_file, error)
+        return
+
+    for output in outputs:
+        path = pathlib.Path(output)
+        logging.debug("Removing output of failed job: %s", path)
+        if path.is_dir() and not path.is_symlink():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+
+
+def run_build( # pylint: disable=too-many-arguments
+        litani, jobs, fail_on_proof_failure, summarize, out_file, history_file):
+    cmd = [
+        str(litani), "run-build", "--out-file", str(out_file),
+    ]
     if jobs:
         cmd.extend(["-j", str(jobs)])
     if fail_on_proof_failure:
         cmd.append("--fail-on-pipeline-failure")
-    if summarize:
-        out_file = pathlib.Path(tempfile.gettempdir(), "run.json").resolve()
-        cmd.extend(["--out-file", str(out_file)])
 
+    out_file.parent.mkdir(parents=True, exist_ok=True)
     logging.debug(" ".join(cmd))
     proc = subprocess.run(cmd, check=False)
 
+    update_history(history_file, out_file)
+
     if proc.returncode and not fail_on_proof_failure:
         logging.critical("Failed to run litani run-build")
         sys.exit(1)
 
     if summarize:
         print_proof_results(out_file)
-        out_file.unlink()
 
     if proc.returncode:
         logging.error("One or more proofs failed")
         sys.exit(10)
 
 def get_litani_path(proof_root):
-    cmd = [
-        "make",
-        "--no-print-directory",
-        f"PROOF_ROOT={proof_root}",
-        "-f", "Makefile.common",
-        "litani-path",
-    ]
-    logging.debug(" ".join(cmd))
-    proc = subprocess.run(cmd, universal_newlines=True, stdout=subprocess.PIPE, check=False)
-    if proc.returncode:
+    litani = get_project_variables(proof_root)["LITANI"]
+    if not litani:
         logging.critical("Could not determine path to litani")
         sys.exit(1)
-    return proc.stdout.strip()
+    return litani
 
 
-def get_litani_capabilities(litani_path):
-    cmd = [litani_path, "print-capabilities"]
-    proc = subprocess.run(
-        cmd, text=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False)
-    if proc.returncode:
-        return []
-    try:
-        return json.loads(proc.stdout)
-    except RuntimeError:
-        logging.warning("Could not load litani capabilities: '%s'", proc.stdout)
-        return []
-
-
-def check_uid_uniqueness(proof_dir, proof_uids):
-    with (pathlib.Path(proof_dir) / "Makefile").open() as handle:
-        for line in handle:
-            match = re.match(r"^PROOF_UID\s*=\s*(?P<uid>\w+)", line)
-            if not match:
-                continue
-            if match["uid"] not in proof_uids:
-                proof_uids[match["uid"]] = proof_dir
-                return
+def get_litani_capabilities(litani_path, proof_root):
+    return litani_capabilities(litani_path, get_manifest_file(proof_root))
+
 
+def needs_litani_capabilities(args):
+    """Whether any decision depends on what Litani is capable of."""
+
+    return (
+        not args.no_standalone or
+        not args.no_memory_profile or
+        not (args.no_expensive_limit or args.memory_budget))
+
+
+def check_uid_uniqueness(proof_dirs, manifest):
+    proof_uids = {}
+    for proof_dir in proof_dirs:
+        if manifest[proof_dir] is None:
+            logging.critical(
+                "Could not evaluate the Makefile in directory '%s'", proof_dir)
+            sys.exit(1)
+
+        uid = manifest[proof_dir]["PROOF_UID"]
+        if not uid:
+            logging.critical(
+                "The Makefile in directory '%s' should contain a line like",
+                proof_dir)
+            logging.critical("PROOF_UID = ...")
+            logging.critical("with a unique identifier for the proof.")
+            sys.exit(1)
+
+        if uid in proof_uids:
             logging.critical(
                 "The Makefile in directory '%s' should have a different "
                 "PROOF_UID than the Makefile in directory '%s'",
-                proof_dir, proof_uids[match["uid"]])
+                proof_dir, proof_uids[uid])
             sys.exit(1)
-
-    logging.critical(
-        "The Makefile in directory '%s' should contain a line like", proof_dir)
-    logging.critical("PROOF_UID = ...")
-    logging.critical("with a unique identifier for the proof.")
-    sys.exit(1)
+        proof_uids[uid] = proof_dir
 
 
 def should_enable_memory_profiling(litani_caps, args):
@@ -296,27 +551,71 @@ def should_enable_memory_profiling(litani_caps, args):
 
 
 def should_enable_pools(litani_caps, args):
-    if args.no_expensive_limit:
+    if args.no_expensive_limit or args.memory_budget:
         return False
     return "pools" in litani_caps
 
 
-async def configure_proof_dirs( # pylint: disable=too-many-arguments
-        queue, counter, proof_uids, enable_pools, enable_memory_profiling, report_target, debug):
-    while True:
-        print_counter(counter)
-        path = str(await queue.get())
+def get_coverage_barrier(proof_root):
+    return pathlib.Path(proof_root) / "output" / "safety-checks-done"
 
-        check_uid_uniqueness(path, proof_uids)
 
-        pools = ["ENABLE_POOLS=true"] if enable_pools else []
-        profiling = [
-            "ENABLE_MEMORY_PROFILING=true"] if enable_memory_profiling else []
+def get_viewer_index_dir(proof_root):
+    return pathlib.Path(proof_root) / "output" / "viewer-index"
+
+
+def should_enable_viewer_index(args):
+    if not args.viewer_index:
+        return False
+    if importlib.util.find_spec("cbmc_starter_kit") is None:
+        logging.warning(
+            "--viewer-index needs the cbmc-starter-kit package; each "
+            "cbmc-viewer job will index the source tree instead")
+        return False
+    return True
+
+
+def get_make_variables(enable_pools, enable_memory_profiling, args, proof_root):
+    make_vars = []
+    if enable_pools:
+        make_vars.append("ENABLE_POOLS=true")
+    if enable_memory_profiling:
+        make_vars.append("ENABLE_MEMORY_PROFILING=true")
+    if args.build_cache:
+        make_vars.append("ENABLE_BUILD_CACHE=true")
+    if args.object_store:
+        make_vars.append("ENABLE_OBJECT_STORE=true")
+    if args.result_cache:
+        make_vars.append("ENABLE_RESULT_CACHE=true")
+    if args.memory_budget:
+        make_vars.append(f"MEMORY_BUDGET={args.memory_budget}")
+    if args.incremental:
+        make_vars.append("INCREMENTAL=true")
+    if args.fused_pipeline:
+        make_vars.append("FUSED_PIPELINE=true")
+    if args.trace_on_demand:
+        make_vars.append("TRACE_ON_DEMAND=true")
+    if args.coverage_policy:
+        make_vars.append(f"COVERAGE_POLICY={' '.join(args.coverage_policy)}")
+    if "deferred" in args.coverage_policy:
+        make_vars.append(f"COVERAGE_BARRIER={get_coverage_barrier(proof_root)}")
+    if args.report_policy:
+        make_vars.append(f"REPORT_POLICY={' '.join(args.report_policy)}")
+    return make_vars
+
+
+async def configure_proof_dirs(
+        queue, counter, make_args, report_target, debug):
+    while True:
+        print_counter(counter)
+        path, litani, proof_vars = await queue.get()
+        path = str(path)
 
         # Allow interactive tasks to preempt proof configuration
         proc = await asyncio.create_subprocess_exec(
-            "nice", "-n", "15", "make", *pools,
-            *profiling, "-B", report_target, "" if debug else "--quiet", cwd=path,
+            "nice", "-n", "15", "make", *make_args, *proof_vars,
+            f"LITANI={litani}",
+            report_target, "" if debug else "--quiet", cwd=path,
             stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
         stdout, stderr = await proc.communicate()
         logging.debug("returncode: %s", str(proc.returncode))
@@ -334,9 +633,8 @@ async def configure_proof_dirs( # pylint: disable=too-many-arguments
         queue.task_done()
 
 
-def add_tool_version_job():
-    cmd = [
-        "litani", "add-job",
+def tool_version_job():
+    return [
         "--command", "./lib/print_tool_versions.py .",
         "--description", "printing out tool versions",
         "--phony-outputs", str(uuid.uuid4()),
@@ -344,28 +642,156 @@ def add_tool_version_job():
         "--ci-stage", "report",
         "--tags", "front-page-text",
     ]
-    proc = subprocess.run(cmd)
-    if proc.returncode:
-        logging.critical("Could not add tool version printing job")
+
+
+def coverage_barrier_job(jobs, barrier):
+    """A job writing barrier after the safety checks of all proofs."""
+
+    inputs = []
+    for job in jobs:
+        job = job_dict(job)
+        if "stats-group:safety checks" in (job["tags"] or []):
+            inputs.extend(job["outputs"] or [])
+    return [
+        "--command", f"touch {barrier}",
+        *(["--inputs", *inputs] if inputs else []),
+        "--outputs", str(barrier),
+        "--description", "waiting for the safety checks of all proofs",
+        "--pipeline-name", "wait_for_safety_checks",
+        "--ci-stage", "test",
+    ]
+
+
+def viewer_index_dirs(proof_dirs, manifest, index_dir):
+    """Map each proof directory to the directory of its viewer index.
+
+    Proofs share an index if they have the same source root SRCDIR and
+    leave the same files out of the report with VIEWER_EXCLUDE.
+    """
+
+    index_dirs = {}
+    for proof_dir in proof_dirs:
+        variables = manifest[proof_dir]
+        root = pathlib.Path(os.path.normpath(
+            pathlib.Path(proof_dir, variables["SRCDIR"])))
+        exclude = hashlib.sha256(
+            variables["VIEWER_EXCLUDE"].encode()).hexdigest()[:16]
+        index_dirs[proof_dir] = (
+            index_dir / root.relative_to(root.anchor) / exclude)
+    return index_dirs
+
+
+def viewer_index_jobs(index_dirs, manifest):
+    """Jobs writing the viewer indexes in index_dirs."""
+
+    indexes = sorted({
+        (out_dir, pathlib.Path(os.path.normpath(
+            pathlib.Path(proof_dir, manifest[proof_dir]["SRCDIR"]))),
+         manifest[proof_dir]["VIEWER_EXCLUDE"])
+        for proof_dir, out_dir in index_dirs.items()})
+    jobs = []
+    for out_dir, root, exclude in indexes:
+        jobs.append([
+            "--command", " ".join([
+                "./lib/viewer_index.py",
+                "--srcdir", shlex.quote(str(root)),
+                *(["--exclude", shlex.quote(exclude)] if exclude else []),
+                "--output-dir", shlex.quote(str(out_dir)),
+                "--tag-index", shlex.quote(str(out_dir / "tag-index.json")),
+            ]),
+            "--outputs",
+            str(out_dir / "viewer-source.json"),
+            str(out_dir / "viewer-symbol.json"),
+            "--description", f"indexing the source tree {root}",
+            "--pipeline-name", "build_viewer_index",
+            "--ci-stage", "build",
+        ])
+    return jobs
+
+
+def add_proof_jobs(litani, record_files, sentinel, barrier=None, extra_jobs=()):
+    try:
+        jobs = []
+        for record_file in record_files:
+            jobs.extend(read_jobs(record_file, sentinel))
+        if barrier is not None:
+            jobs.append(coverage_barrier_job(jobs, barrier))
+        jobs.extend(extra_jobs)
+        jobs.append(tool_version_job())
+        add_jobs(litani, jobs, task_pool_size())
+    except UserWarning as error:
+        logging.critical("%s", error)
         sys.exit(1)
 
 
-async def main(): # pylint: disable=too-many-locals
+async def main(): # pylint: disable=too-many-branches,too-many-locals,too-many-statements
     args = get_args()
     set_up_logging(args.verbose)
 
     proof_root = pathlib.Path(os.getcwd())
-    litani = get_litani_path(proof_root)
 
-    litani_caps = get_litani_capabilities(litani)
+    proof_dirs = get_proof_dirs(proof_root, args.proofs, args.marker_file)
+    if not proof_dirs:
+        logging.critical("No proof directories found")
+        sys.exit(1)
+
+    manifest = proof_manifest(proof_dirs, get_manifest_file(proof_root))
+
+    if args.changed_since is not None:
+        proof_dirs = select_affected_proofs(
+            proof_root, proof_dirs, manifest, args.changed_since)
+        if not proof_dirs:
+            print(
+                f"No proofs are affected by changes since {args.changed_since}",
+                file=sys.stderr)
+            sys.exit(0)
+
+    check_uid_uniqueness(proof_dirs, manifest)
+
+    run_file = proof_root / "output" / "run.json"
+    history_file = proof_root / "output" / "proof-history.json"
+
+    if args.incremental:
+        remove_failed_outputs(run_file)
+
+    expected = (
+        get_expected_durations(proof_dirs, manifest, history_file)
+        if args.shard is not None or args.longest_first else {})
+    if args.shard is not None:
+        proof_dirs = select_shard(proof_dirs, expected, args.shard)
+        if not proof_dirs:
+            print(
+                f"No proofs to run in shard {args.shard[0]}/{args.shard[1]}",
+                file=sys.stderr)
+            sys.exit(0)
+
+    litani = get_litani_path(proof_root)
+    litani_caps = (
+        get_litani_capabilities(litani, proof_root)
+        if needs_litani_capabilities(args) else [])
     enable_pools = should_enable_pools(litani_caps, args)
-    init_pools = [
-        "--pools", f"expensive:{args.expensive_jobs_parallelism}"
+    pools = [
+        f"expensive:{args.expensive_jobs_parallelism}"
     ] if enable_pools else []
 
+    longest = []
+    if args.longest_first:
+        if "pools" in litani_caps and not args.no_standalone:
+            longest, depth = get_check_pool(
+                {proof_dir: expected[proof_dir] for proof_dir in proof_dirs},
+                args.parallel_jobs)
+            if longest:
+                pools.append(f"{CHECK_POOL}:{depth}")
+        else:
+            logging.warning(
+                "Ignoring --longest-first: it needs a Litani with job pools "
+                "and a run that this script initializes")
+    init_pools = ["--pools", *pools] if pools else []
+
     if not args.no_standalone:
+        project_name = args.project_name or get_project_name(proof_root)
         cmd = [
-            str(litani), "init", *init_pools, "--project", args.project_name,
+            str(litani), "init", *init_pools, "--project", project_name,
             "--no-print-out-dir",
         ]
 
@@ -387,15 +813,28 @@ async def main(): # pylint: disable=too-many-locals
             logging.critical("Failed to run litani init")
             sys.exit(1)
 
-    proof_dirs = list(get_proof_dirs(
-        proof_root, args.proofs, args.marker_file))
-    if not proof_dirs:
-        logging.critical("No proof directories found")
-        sys.exit(1)
+    # Each proof Makefile records its Litani jobs in a file instead of
+    # running litani, and all the jobs are added to the run at the end.
+    record_dir = tempfile.TemporaryDirectory(prefix="litani-jobs-")
+    sentinel = f"litani-{uuid.uuid4()}"
+    record_files = []
+
+    index_dirs = (
+        viewer_index_dirs(
+            proof_dirs, manifest, get_viewer_index_dir(proof_root))
+        if should_enable_viewer_index(args) else {})
 
     proof_queue = asyncio.Queue()
     for proof_dir in proof_dirs:
-        proof_queue.put_nowait(proof_dir)
+        record_file = pathlib.Path(record_dir.name, f"{len(record_files)}")
+        record_files.append(record_file)
+        proof_vars = (
+            [f"VIEWER_INDEX_DIR={index_dirs[proof_dir]}"]
+            if proof_dir in index_dirs else [])
+        if longest and proof_dir not in longest:
+            proof_vars.append(f"CHECK_POOL={CHECK_POOL}")
+        proof_queue.put_nowait(
+            (proof_dir, recorder(record_file, sentinel), proof_vars))
 
     counter = {
         "pass": [],
@@ -405,22 +844,22 @@ async def main(): # pylint: disable=too-many-locals
         "width": int(math.log10(len(proof_dirs))) + 1
     }
 
-    proof_uids = {}
     tasks = []
 
     enable_memory_profiling = should_enable_memory_profiling(litani_caps, args)
+    make_vars = get_make_variables(
+        enable_pools, enable_memory_profiling, args, proof_root)
+    # Without -B, make adds only the jobs whose outputs are out of date
+    make_args = make_vars if args.incremental else ["-B", *make_vars]
     report_target = "_report_no_coverage" if args.no_coverage else "_report"
 
     for _ in range(task_pool_size()):
         task = asyncio.create_task(configure_proof_dirs(
-            proof_queue, counter, proof_uids, enable_pools,
-            enable_memory_profiling, report_target, args.debug))
+            proof_queue, counter, make_args, report_target, args.debug))
         tasks.append(task)
 
     await proof_queue.join()
 
-    add_tool_version_job()
-
     print_counter(counter)
     print("", file=sys.stderr)
 
@@ -430,8 +869,19 @@ async def main(): # pylint: disable=too-many-locals
                 [str(f) for f in counter["fail"]]))
         sys.exit(1)
 
+    barrier = (
+        get_coverage_barrier(proof_root)
+        if "deferred" in args.coverage_policy and not args.no_coverage
+        else None)
+    add_proof_jobs(
+        litani, record_files, sentinel, barrier,
+        viewer_index_jobs(index_dirs, manifest))
+    record_dir.cleanup()
+
     if not args.no_standalone:
-        run_build(litani, args.parallel_jobs, args.fail_on_proof_failure, args.summarize)
+        run_build(
+            litani, args.parallel_jobs, args.fail_on_proof_failure,
+            args.summarize, run_file, history_file)
 
 
 if __name__ == "__main__":
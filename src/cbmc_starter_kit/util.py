@@ -88,12 +88,13 @@ def ask_for_function_name():
 
     return input("What is the function name? ").strip()
 
-def ask_for_source_file(func, cwd=None, repo=None):
+def ask_for_source_file(func, cwd=None, repo=None, include=None, exclude=None):
     """Ask user to select path to source file defining function func."""
 
     cwd = Path(cwd or Path.cwd()).resolve()
     repo = Path(repo or repository.repository_root(cwd=cwd)).resolve()
-    sources = repository.function_sources(func, cwd=cwd, repo=repo)
+    sources = repository.function_sources(
+        func, cwd=cwd, repo=repo, include=include, exclude=exclude)
     options = sources + ["The source file is not listed here"]
     choices = [str(idx) for idx in range(len(options))]
     index = choices[-1]
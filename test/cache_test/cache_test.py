@@ -0,0 +1,174 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import unittest
+
+import json
+import pathlib
+import subprocess
+import sys
+import tempfile
+
+sys.path.append("../../src/cbmc_starter_kit/template-for-repository/proofs/lib")
+import cache
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmp.name)
+        self.cache_dir = self.root / "cache"
+        self.input = self.root / "input.txt"
+        self.output = self.root / "output.txt"
+        self.runs = self.root / "runs.txt"
+        self.input.write_text("hello\n")
+
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+    def run_cached(self, *flags):
+        # The command copies the input to the output and counts its runs
+        command = 'echo run >> "$1"; cat "$0"; cp "$0" "$2"'
+        return subprocess.run([
+            sys.executable, cache.__file__, "run",
+            "--cache-dir", str(self.cache_dir),
+            "--inputs", str(self.input),
+            "--outputs", str(self.output),
+            *flags,
+            "--", "sh", "-c", command,
+            str(self.input), str(self.runs), str(self.output),
+        ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+            check=False)
+
+
+    def count_runs(self):
+        return len(self.runs.read_text().splitlines())
+
+
+    def test_hit_restores_outputs(self):
+        self.run_cached()
+        self.output.unlink()
+        self.run_cached()
+        self.assertEqual(self.count_runs(), 1)
+        self.assertEqual(self.output.read_text(), "hello\n")
+
+
+    def test_changed_input_misses(self):
+        self.run_cached()
+        self.input.write_text("goodbye\n")
+        self.run_cached()
+        self.assertEqual(self.count_runs(), 2)
+        self.assertEqual(self.output.read_text(), "goodbye\n")
+
+
+    def test_stdout_is_restored(self):
+        first = self.run_cached("--stdout")
+        second = self.run_cached("--stdout")
+        self.assertEqual(self.count_runs(), 1)
+        self.assertEqual(first.stdout, "hello\n")
+        self.assertEqual(second.stdout, "hello\n")
+
+
+    def test_relocatable_inputs_share_entries(self):
+        self.run_cached("--relocatable", "--stdout")
+        self.input = self.root / "copy.txt"
+        self.input.write_text("hello\n")
+        self.run_cached("--relocatable", "--stdout")
+        self.assertEqual(self.count_runs(), 1)
+
+
+    def test_eviction(self):
+        self.run_cached("--max-size", "1")
+        self.run_cached("--max-size", "1")
+        self.assertEqual(self.count_runs(), 2)
+
+
+    def run_compile(self, *sources):
+        # The compiler preprocesses, compiles, and links with cat,
+        # and counts its compilations
+        compiler = self.root / "cc"
+        compiler.write_text(
+            '#!/bin/sh\n'
+            'while [ $# -gt 0 ]; do\n'
+            '  case "$1" in\n'
+            '    -E) mode=E;; -c) mode=c;; -o) out="$2"; shift;;\n'
+            '    *) files="$files $1";;\n'
+            '  esac; shift\n'
+            'done\n'
+            f'[ "$mode" = c ] && echo compile >> {self.runs}\n'
+            'if [ "$mode" = E ]; then cat $files; else cat $files > "$out"; fi\n')
+        compiler.chmod(0o755)
+        return subprocess.run([
+            sys.executable, cache.__file__, "compile",
+            "--cache-dir", str(self.cache_dir),
+            "--sources", *[str(source) for source in sources],
+            "--output", str(self.output),
+            "--", str(compiler), *[str(source) for source in sources],
+            "-o", str(self.output),
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+
+
+    def test_compile_shares_objects(self):
+        other = self.root / "other.c"
+        other.write_text("world\n")
+        self.run_compile(self.input, other)
+        self.output.unlink()
+        self.run_compile(other, self.input)
+        self.assertEqual(self.count_runs(), 2)
+        self.assertEqual(self.output.read_text(), "world\nhello\n")
+
+
+    def test_compile_changed_source_misses(self):
+        other = self.root / "other.c"
+        other.write_text("world\n")
+        self.run_compile(self.input, other)
+        other.write_text("goodbye\n")
+        self.run_compile(self.input, other)
+        self.assertEqual(self.count_runs(), 3)
+        self.assertEqual(self.output.read_text(), "hello\ngoodbye\n")
+
+
+    def run_crangle(self, output):
+        # The crangler copies the source to the output and counts its runs
+        crangler = self.root / "crangler"
+        crangler.write_text(
+            f'#!{sys.executable}\n'
+            'import json, shutil, sys\n'
+            'config = json.load(open(sys.argv[1]))\n'
+            f'open("{self.runs}", "a").write("run\\n")\n'
+            'shutil.copyfile(config["sources"][0], config["output"])\n')
+        crangler.chmod(0o755)
+        config = self.root / f"{output.name}.json"
+        config.write_text(json.dumps({
+            "sources": [str(self.input)], "includes": [], "defines": [],
+            "functions": [{"foo": ["remove static"]}], "objects": [{}],
+            "output": str(output),
+        }))
+        subprocess.run([
+            sys.executable, cache.__file__, "crangle",
+            "--cache-dir", str(self.cache_dir),
+            "--config", str(config),
+            "--preprocessor", "cpp",
+            "--", str(crangler), str(config),
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+
+
+    def test_crangle_shares_outputs(self):
+        first = self.root / "first.i"
+        second = self.root / "second.i"
+        self.run_crangle(first)
+        self.run_crangle(second)
+        self.assertEqual(self.count_runs(), 1)
+        self.assertEqual(second.read_text(), "hello\n")
+
+
+    def test_parse_size(self):
+        self.assertEqual(cache.parse_size("512"), 512)
+        self.assertEqual(cache.parse_size("2K"), 2048)
+        self.assertEqual(cache.parse_size("1.5G"), 3 * 1024 ** 3 // 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append("../../src/cbmc_starter_kit")
+import ctagst # pylint: disable=wrong-import-position
+
+
+# A universal ctags that tags no symbols, or that fails
+_CTAGS = {
+    "empty": "#!/bin/sh\ncat > /dev/null\n",
+    "failing": "#!/bin/sh\nexit 1\n",
+}
+
+
+class TestIndexedCtags(unittest.TestCase):
+
+    def _indexed_ctags(self, tmp, ctags, files):
+        bindir = pathlib.Path(tmp) / "bin"
+        bindir.mkdir(exist_ok=True)
+        (bindir / "ctags").write_text(_CTAGS[ctags])
+        (bindir / "ctags").chmod(0o755)
+        path = f"{bindir}{os.pathsep}{os.environ['PATH']}"
+        with mock.patch.dict(os.environ, {"PATH": path}):
+            return ctagst.indexed_ctags(
+                pathlib.Path(tmp) / "src", files,
+                pathlib.Path(tmp) / "index.json")
+
+    def _indexed_files(self, tmp):
+        with open(pathlib.Path(tmp) / "index.json", encoding="utf-8") as handle:
+            return sorted(json.load(handle)["files"])
+
+    def _write_sources(self, tmp, files):
+        for file_ in files:
+            path = pathlib.Path(tmp) / "src" / file_
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("")
+
+    def test_files_without_symbols_are_indexed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self._write_sources(tmp, ["a.c", "b.c"])
+            self.assertEqual(self._indexed_ctags(tmp, "empty", ["a.c", "b.c"]), [])
+            self.assertEqual(self._indexed_files(tmp), ["a.c", "b.c"])
+
+    def test_files_are_not_indexed_if_ctags_fails(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self._write_sources(tmp, ["a.c", "b.c"])
+            self._indexed_ctags(tmp, "empty", ["a.c", "b.c"])
+
+            # b.c is removed and c.c is added, but c.c cannot be tagged
+            (pathlib.Path(tmp) / "src" / "b.c").unlink()
+            self._write_sources(tmp, ["c.c"])
+            self.assertEqual(self._indexed_ctags(tmp, "failing", ["a.c", "c.c"]), [])
+            self.assertEqual(self._indexed_files(tmp), ["a.c"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.append("../../src/cbmc_starter_kit/template-for-repository/proofs/lib")
+import dependencies # pylint: disable=wrong-import-position
+
+
+def _git(cwd, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com",
+         *args], cwd=cwd, check=True, stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL)
+
+
+def _commit(repo, *names):
+    _git(repo, "add", *names)
+    _git(repo, "commit", "-q", "-m", "commit")
+
+
+class TestDependencies(unittest.TestCase):
+
+    def test_included_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = pathlib.Path(os.path.realpath(tmp))
+            (tmp / "foo.h").write_text("#define FOO 1\n")
+            (tmp / "foo.c").write_text('#include "foo.h"\nint x = FOO;\n')
+
+            files = dependencies.included_files(
+                ["cc", "-E", f"-I{tmp}"], str(tmp / "foo.c"))
+            self.assertIn(str(tmp / "foo.h"), files)
+            self.assertIn(str(tmp / "foo.c"), files)
+
+    def test_changed_files_in_submodule(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            top = pathlib.Path(os.path.realpath(tmp))
+            sub = top / "sub"
+            sub.mkdir()
+            _git(top, "init", "-q")
+            _git(sub, "init", "-q")
+            (sub / "lib.c").write_text("int x;\n")
+            (sub / "lib.h").write_text("int y;\n")
+            _commit(sub, "lib.c", "lib.h")
+            (top / "main.c").write_text("int z;\n")
+            _commit(top, "sub", "main.c")
+            _git(top, "tag", "before")
+
+            # A commit that only moves the submodule to a new commit
+            (sub / "lib.h").write_text("int y, w;\n")
+            _commit(sub, "lib.h")
+            _commit(top, "sub")
+            self.assertEqual(
+                dependencies.changed_files("before", top),
+                {str(top / "sub"), str(sub / "lib.h")})
+
+            (sub / "lib.c").write_text("int x = 1;\n")
+            (sub / "new.c").write_text("int v;\n")
+            self.assertEqual(
+                dependencies.changed_files("before", top), {
+                    str(top / "sub"), str(sub / "lib.h"),
+                    str(sub / "lib.c"), str(sub / "new.c")})
+
+    def test_affected_proofs(self):
+        index = {
+            "/src/proofs/foo": ["/src/foo.c", "/src/foo.h"],
+            "/src/proofs/bar": ["/src/bar.c"],
+            "/src/proofs/baz": None,
+        }
+        self.assertEqual(
+            dependencies.affected_proofs(index, {"/src/foo.h"}),
+            ["/src/proofs/foo", "/src/proofs/baz"])
+        self.assertEqual(
+            dependencies.affected_proofs(index, {"/src/proofs/bar/new.c"}),
+            ["/src/proofs/bar", "/src/proofs/baz"])
+        self.assertEqual(
+            dependencies.affected_proofs(index, {"/src/proofs/barbar/x.c"}),
+            ["/src/proofs/baz"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append("../../src/cbmc_starter_kit/template-for-repository/proofs/lib")
+import discovery # pylint: disable=wrong-import-position
+
+
+MARKER = "cbmc-proof.txt"
+
+
+class TestDiscovery(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmp.name)
+        self.index_file = self.root / "output" / "proof-dirs.json"
+        for proof in ["foo", "group/bar"]:
+            (self.root / proof).mkdir(parents=True)
+            (self.root / proof / MARKER).touch()
+        # Artifacts of earlier runs that must not be searched
+        for artifact in ["foo/gotos/x", "output/latest/y", ".git/z"]:
+            (self.root / artifact).mkdir(parents=True)
+            (self.root / artifact / MARKER).touch()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def proof_dirs(self):
+        return discovery.proof_dirs(self.root, MARKER, self.index_file)
+
+    def test_search_prunes_artifacts(self):
+        proofs, mtimes = discovery.search(self.root, MARKER)
+        self.assertEqual(
+            proofs, [str(self.root / "foo"), str(self.root / "group/bar")])
+        self.assertNotIn(str(self.root / "foo" / "gotos"), mtimes)
+        self.assertNotIn(str(self.root / "output"), mtimes)
+
+    def test_index_skips_search(self):
+        proofs = self.proof_dirs()
+        with mock.patch.object(discovery, "search", side_effect=AssertionError):
+            self.assertEqual(self.proof_dirs(), proofs)
+
+    def test_index_revalidated(self):
+        self.proof_dirs()
+        baz = self.root / "group" / "baz"
+        baz.mkdir()
+        (baz / MARKER).touch()
+        # Make sure the change is visible on file systems with coarse mtimes
+        stat = os.stat(self.root / "group")
+        os.utime(
+            self.root / "group", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertIn(str(baz), self.proof_dirs())
+
+
+if __name__ == '__main__':
+    unittest.main()
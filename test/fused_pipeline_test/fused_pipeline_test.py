@@ -0,0 +1,153 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+PROOF_ROOT = pathlib.Path(
+    "../../src/cbmc_starter_kit/template-for-repository/proofs").resolve()
+
+# Litani runs each job as soon as it is added, which make does in the
+# order of the dependencies between the jobs
+LITANI = f"""#!{sys.executable}
+import argparse, os, subprocess, sys
+if sys.argv[1] != "add-job":
+    sys.exit(0)
+pars = argparse.ArgumentParser()
+pars.add_argument("--command")
+pars.add_argument("--outputs", nargs="*", default=[])
+args, _ = pars.parse_known_args(sys.argv[2:])
+for output in args.outputs:
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+sys.exit(subprocess.run(args.command, shell=True, check=False).returncode)
+"""
+
+# goto-cc writes the names of its inputs, and goto-instrument appends
+# its flags to its input, so the harness records the passes it went
+# through in order
+GOTO_CC = """#!/bin/sh
+while [ $# -gt 0 ]; do
+  case "$1" in
+    -o) out="$2"; shift;;
+    *.c|*.goto) ins="$ins $(basename "$1")";;
+  esac
+  shift
+done
+echo "goto-cc$ins" > "$out"
+"""
+
+GOTO_INSTRUMENT = """#!/bin/sh
+flags=""
+while [ $# -gt 2 ]; do flags="$flags $1"; shift; done
+{ cat "$1"; echo "goto-instrument$flags"; } > "$2"
+"""
+
+PROOF_MAKEFILE = """
+HARNESS_ENTRY = harness
+HARNESS_FILE = foo_harness
+PROOF_UID = foo
+PROOF_SOURCES += $(PROOFDIR)/$(HARNESS_FILE).c
+PROJECT_SOURCES += $(PROOFDIR)/foo.c
+include ../Makefile.common
+"""
+
+
+class TestFusedPipeline(unittest.TestCase):
+    """The fused pipeline runs the same goto-instrument passes in order.
+
+    If goto-cc and goto-instrument are installed, the harnesses built
+    by the two pipelines are compared with goto-instrument
+    --show-goto-functions instead.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.tmp.name)
+        proofs = root / "proofs"
+        proofs.mkdir()
+        shutil.copy(PROOF_ROOT / "Makefile.common", proofs)
+        shutil.copytree(PROOF_ROOT / "lib", proofs / "lib")
+
+        self.proof = proofs / "foo"
+        self.proof.mkdir()
+        (self.proof / "Makefile").write_text(PROOF_MAKEFILE)
+        (self.proof / "foo.c").write_text(
+            "static int count;\nint foo(int x) { count++; return x + 1; }\n")
+        (self.proof / "foo_harness.c").write_text(
+            "int foo(int x);\nvoid harness(void) { int x; foo(x); }\n")
+
+        self.bin_dir = root / "bin"
+        self.bin_dir.mkdir()
+        self.real_tools = all(
+            shutil.which(tool) for tool in ["goto-cc", "goto-instrument"])
+        tools = {"litani": LITANI}
+        if not self.real_tools:
+            tools.update({"goto-cc": GOTO_CC, "goto-instrument": GOTO_INSTRUMENT})
+        for name, text in tools.items():
+            path = self.bin_dir / name
+            path.write_text(text)
+            path.chmod(0o755)
+
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+    def build_harness(self, *variables):
+        shutil.rmtree(self.proof / "gotos", ignore_errors=True)
+        env = dict(os.environ)
+        env["PATH"] = f"{self.bin_dir}{os.pathsep}{env['PATH']}"
+        subprocess.run(
+            ["make", "--quiet", "-B", "LITANI=litani", *variables, "_goto"],
+            cwd=self.proof, env=env, stdout=subprocess.DEVNULL, check=True)
+        harness = self.proof / "gotos" / "foo_harness.goto"
+        if not self.real_tools:
+            return harness.read_text()
+        return subprocess.run(
+            ["goto-instrument", "--show-goto-functions", str(harness)],
+            stdout=subprocess.PIPE, universal_newlines=True,
+            check=True).stdout
+
+
+    def assert_same_harness(self, *variables):
+        staged = self.build_harness(*variables)
+        fused = self.build_harness("FUSED_PIPELINE=true", *variables)
+        self.assertEqual(fused, staged)
+
+
+    def test_default(self):
+        self.assert_same_harness()
+
+
+    def test_nondet_static(self):
+        self.assert_same_harness("NONDET_STATIC=--nondet-static")
+
+
+    def test_function_contracts(self):
+        self.assert_same_harness("USE_FUNCTION_CONTRACTS=foo")
+
+
+    def test_fused_jobs(self):
+        if self.real_tools:
+            self.skipTest("counts the passes of the fake goto-instrument")
+        passes = self.build_harness(
+            "FUSED_PIPELINE=true", "NONDET_STATIC=--nondet-static")
+        self.assertEqual(
+            [line for line in passes.splitlines()
+             if line.startswith("goto-instrument")], [
+                "goto-instrument --remove-function-pointers",
+                "goto-instrument --nondet-static",
+                "goto-instrument --nondet-static",
+                "goto-instrument --slice-global-inits",
+                "goto-instrument --drop-unused-functions",
+            ])
+
+
+if __name__ == '__main__':
+    unittest.main()
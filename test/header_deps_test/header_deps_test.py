@@ -0,0 +1,59 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.append("../../src/cbmc_starter_kit/template-for-repository/proofs/lib")
+import header_deps # pylint: disable=wrong-import-position
+
+
+class TestHeaderDeps(unittest.TestCase):
+
+    def test_preprocessor_command(self):
+        self.assertEqual(
+            header_deps.preprocessor_command(
+                ["cache.py", "run", "--inputs", "a.c", "--",
+                 "goto-cc", "-Wall", "-DX=1", "a.c", "b.c", "-o", "out.goto"],
+                ["a.c", "b.c"]),
+            ["goto-cc", "-Wall", "-DX=1", "-E"])
+        self.assertEqual(
+            header_deps.preprocessor_command(
+                ["goto-cc", "-o", "out.goto", "-I.", "a.c"], ["a.c"]),
+            ["goto-cc", "-I.", "-E"])
+
+    def test_depfile(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = pathlib.Path(os.path.realpath(tmp))
+            (tmp / "foo.h").write_text("#define FOO 1\n")
+            (tmp / "bar.h").write_text('#include "foo.h"\n')
+            (tmp / "foo.c").write_text('#include "bar.h"\nint x = FOO;\n')
+            (tmp / "baz.c").write_text("int y;\n")
+            sources = [str(tmp / "foo.c"), str(tmp / "baz.c")]
+
+            headers = header_deps.header_dependencies(
+                ["cc", f"-I{tmp}", *sources, "-o", str(tmp / "out.goto")],
+                sources)
+            self.assertIn(str(tmp / "foo.h"), headers)
+            self.assertIn(str(tmp / "bar.h"), headers)
+            self.assertNotIn(sources[0], headers)
+
+            depfile = tmp / "gotos" / "out.d"
+            header_deps.write_depfile(
+                depfile, "out.goto", [str(tmp / "bar.h"), str(tmp / "foo.h")])
+            self.assertEqual(depfile.read_text().splitlines(), [
+                "out.goto: \\",
+                f"  {tmp / 'bar.h'} \\",
+                f"  {tmp / 'foo.h'} \\",
+                "",
+                f"{tmp / 'bar.h'}:",
+                f"{tmp / 'foo.h'}:",
+            ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import json
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.append("../../src/cbmc_starter_kit/template-for-repository/proofs/lib")
+import history # pylint: disable=wrong-import-position
+
+
+def _pipeline(name, *durations, complete=True, memory=None):
+    return {
+        "name": name,
+        "ci_stages": [{
+            "jobs": [{
+                "complete": complete,
+                "duration": duration,
+                "memory_trace": {"peak": {"rss": memory}} if memory else {},
+            } for duration in durations]
+        }],
+    }
+
+
+class TestHistory(unittest.TestCase):
+
+    def test_update_history(self):
+        run = {"pipelines": [
+            _pipeline("foo", 300, 20, memory=2048),
+            _pipeline("bar", 5, complete=False),
+            _pipeline("print_tool_versions", 1),
+            _pipeline("wait_for_safety_checks", 400),
+        ]}
+        with tempfile.TemporaryDirectory() as tmp:
+            run_file = pathlib.Path(tmp) / "run.json"
+            history_file = pathlib.Path(tmp) / "history.json"
+            run_file.write_text(json.dumps(run))
+            history_file.write_text(json.dumps({
+                "bar": {"duration": 7, "memory": 1024},
+                "foo": {"duration": 1},
+            }))
+
+            history.update_history(history_file, run_file)
+            self.assertEqual(history.load_history(history_file), {
+                "bar": {"duration": 7, "memory": 1024},
+                "foo": {"duration": 320, "memory": 2048},
+            })
+
+    def test_expected_durations(self):
+        uids = ["a", "b", "c", "d"]
+        self.assertEqual(
+            history.expected_durations(
+                uids, {"a": {"duration": 10}, "b": {"duration": 30}}, {"c"}),
+            {"a": 10, "b": 30, "c": 30, "d": 20})
+        self.assertEqual(
+            history.expected_durations(uids, {}, {"c"}),
+            {"a": 0, "b": 0, "c": 1, "d": 0})
+
+    def test_longest_proofs(self):
+        expected = {"a": 60, "b": 100, "c": 10, "d": 10, "e": 10, "f": 10}
+        self.assertEqual(history.longest_proofs(expected, 4), ["b", "a"])
+        self.assertEqual(history.longest_proofs(expected, 3), ["b"])
+        self.assertEqual(history.longest_proofs(expected, 2), [])
+        self.assertEqual(
+            history.longest_proofs(dict.fromkeys("abc", 5), 3), [])
+        self.assertEqual(history.longest_proofs({}, 8), [])
+
+    def test_partition(self):
+        expected = {"a": 10, "b": 7, "c": 5, "d": 4, "e": 1}
+        self.assertEqual(
+            history.partition(expected, 2), [["a", "d"], ["b", "c", "e"]])
+        self.assertEqual(
+            history.partition(dict.fromkeys("abcde", 0), 2),
+            [["a", "c", "e"], ["b", "d"]])
+        self.assertEqual(history.partition({"a": 1}, 3), [["a"], [], []])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import pathlib
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.append("../../src/cbmc_starter_kit/template-for-repository/proofs/lib")
+import litani_jobs # pylint: disable=wrong-import-position
+
+
+class TestLitaniJobs(unittest.TestCase):
+
+    def test_record_jobs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            record_file = pathlib.Path(tmp) / "jobs"
+            litani = litani_jobs.recorder(record_file, "SENTINEL")
+            subprocess.run(
+                f"{litani} add-job --command 'cbmc  --trace\n x.goto' "
+                "--pipeline-name proof --ci-stage test "
+                "--ignore-returns 10 --timeout 30; "
+                f"echo not a job; {litani} add-job --command true "
+                "--pipeline-name proof --ci-stage report --tags a b",
+                shell=True, check=True, stdout=subprocess.DEVNULL)
+
+            jobs = litani_jobs.read_jobs(record_file, "SENTINEL")
+            self.assertEqual(len(jobs), 2)
+            self.assertEqual(jobs[0][:2], ["--command", "cbmc  --trace\n x.goto"])
+
+            job = litani_jobs.job_dict(jobs[0])
+            self.assertEqual(job["subcommand"], "add-job")
+            self.assertEqual(job["command"], "cbmc  --trace\n x.goto")
+            self.assertEqual(job["ci_stage"], "test")
+            self.assertEqual(job["ignore_returns"], ["10"])
+            self.assertEqual(job["timeout"], 30)
+            self.assertEqual(job["profile_memory_interval"], 10)
+            self.assertIsNone(job["outputs"])
+            self.assertEqual(litani_jobs.job_dict(jobs[1])["tags"], ["a", "b"])
+
+    def test_failed_outputs(self):
+        def job(output, outcome, timeout_reached=False, complete=True):
+            return {
+                "wrapper_arguments": {"outputs": [output]},
+                "complete": complete,
+                "timeout_reached": timeout_reached,
+                "outcome": outcome,
+            }
+        run = {"pipelines": [{"ci_stages": [{"jobs": [
+            job("proof.goto", "success"),
+            job("result.xml", "fail_ignored"),
+            job("coverage.xml", "fail", timeout_reached=True),
+            job("property.xml", "fail"),
+        ]}, {"jobs": [
+            job("report", "success", complete=False),
+            {"wrapper_arguments": {"outputs": None}, "outcome": "fail"},
+        ]}]}]}
+        self.assertEqual(
+            litani_jobs.failed_outputs(run),
+            ["coverage.xml", "property.xml", "report"])
+
+    def test_unknown_flag(self):
+        with self.assertRaises(UserWarning):
+            litani_jobs.job_dict([
+                "--command", "true", "--pipeline-name", "proof",
+                "--ci-stage", "test", "--no-such-flag"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.append("../../src/cbmc_starter_kit/template-for-repository/proofs/lib")
+import manifest # pylint: disable=wrong-import-position
+
+
+_COMMON = """
+PROJECT_NAME = "my project"
+LITANI ?= litani
+PROOF_UID ?= $(HARNESS_ENTRY)
+.PHONY: echo-variables
+echo-variables:
+\t$(foreach var,$(PRINT_VARIABLES),$(info $(var)=$(strip $($(var)))))
+"""
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmp.name)
+        (self.root / "Makefile.common").write_text(_COMMON)
+        self.proof_dir = self.root / "proof"
+        self.proof_dir.mkdir()
+        self.makefile = self.proof_dir / "Makefile"
+        self.makefile.write_text(
+            "HARNESS_ENTRY = harness\nEXPENSIVE = true\n"
+            "include ../Makefile.common\n")
+        self.manifest_file = self.root / "output" / "manifest.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_proof_manifest(self):
+        proofs = manifest.proof_manifest([self.proof_dir], self.manifest_file)
+        variables = proofs[self.proof_dir]
+        self.assertEqual(variables["PROOF_UID"], "harness")
+        self.assertEqual(variables["EXPENSIVE"], "true")
+        self.assertEqual(variables["CBMCFLAGS"], "")
+
+        entry = manifest.load_manifest(self.manifest_file)["proofs"][
+            str(self.proof_dir)]
+        self.assertEqual(
+            sorted(entry["makefiles"]),
+            [str(self.root / "Makefile.common"), str(self.makefile)])
+        self.assertTrue(manifest.is_current(entry, manifest.PROOF_VARIABLES))
+
+    def test_invalidated_by_makefile_change(self):
+        manifest.proof_manifest([self.proof_dir], self.manifest_file)
+        self.makefile.write_text(
+            "HARNESS_ENTRY = other\ninclude ../Makefile.common\n")
+        stat = self.makefile.stat()
+        os.utime(self.makefile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        proofs = manifest.proof_manifest([self.proof_dir], self.manifest_file)
+        self.assertEqual(proofs[self.proof_dir]["PROOF_UID"], "other")
+        self.assertEqual(proofs[self.proof_dir]["EXPENSIVE"], "")
+
+    def test_make_failure(self):
+        self.makefile.write_text("include missing.mk\n")
+        proofs = manifest.proof_manifest([self.proof_dir], self.manifest_file)
+        self.assertIsNone(proofs[self.proof_dir])
+
+    def test_project_variables_cached(self):
+        variables = manifest.project_variables(self.root, self.manifest_file)
+        self.assertEqual(variables["PROJECT_NAME"], '"my project"')
+        self.assertEqual(variables["LITANI"], "litani")
+
+        # The cached values are used without running make again
+        path = os.environ["PATH"]
+        os.environ["PATH"] = ""
+        try:
+            self.assertEqual(
+                manifest.project_variables(self.root, self.manifest_file),
+                variables)
+            os.environ["LITANI"] = "other-litani"
+            with self.assertRaises(UserWarning):
+                manifest.project_variables(self.root, self.manifest_file)
+        finally:
+            os.environ["PATH"] = path
+            os.environ.pop("LITANI")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append("../../src/cbmc_starter_kit/template-for-repository/proofs/lib")
+import memory_budget # pylint: disable=wrong-import-position
+
+
+def _start(tmp, estimate, command, timeout=None):
+    return subprocess.Popen([
+        sys.executable, memory_budget.__file__,
+        "--budget", "10M",
+        "--ledger", str(pathlib.Path(tmp) / "ledger.json"),
+        "--estimate", estimate,
+        *(["--timeout", str(timeout)] if timeout else []),
+        "--", *command,
+    ])
+
+
+class TestMemoryBudget(unittest.TestCase):
+
+    def _run_all(self, tmp, estimates, processes=1):
+        log = pathlib.Path(tmp) / "log"
+        procs = [
+            subprocess.Popen([
+                sys.executable, memory_budget.__file__,
+                "--budget", "10M",
+                "--ledger", str(pathlib.Path(tmp) / "ledger.json"),
+                "--estimate", estimate,
+                "--processes", str(processes),
+                "--", "sh", "-c",
+                'echo start >> "$0"; sleep 1; echo end >> "$0"', str(log),
+            ]) for estimate in estimates
+        ]
+        for proc in procs:
+            self.assertEqual(proc.wait(), 0)
+        return log.read_text().split()
+
+    def test_jobs_that_fit_run_together(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(
+                self._run_all(tmp, ["4M", "4M"]),
+                ["start", "start", "end", "end"])
+
+    def test_jobs_that_do_not_fit_wait(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(
+                self._run_all(tmp, ["6M", "6M"]),
+                ["start", "end", "start", "end"])
+
+    def test_jobs_reserve_memory_for_each_process(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(
+                self._run_all(tmp, ["3M", "3M"], processes=2),
+                ["start", "end", "start", "end"])
+
+    def test_job_larger_than_budget_runs_alone(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(
+                self._run_all(tmp, ["20M", "1M"]),
+                ["start", "end", "start", "end"])
+
+    def test_timeout_does_not_count_waiting(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = _start(tmp, "6M", ["sleep", "3"])
+            time.sleep(0.5)
+            waiting = _start(tmp, "6M", ["sleep", "1"], timeout=2)
+            self.assertEqual(first.wait(), 0)
+            self.assertEqual(waiting.wait(), 0)
+
+    def test_timeout_kills_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.time()
+            proc = _start(tmp, "1M", ["sh", "-c", "sleep 30; sleep 30"], timeout=1)
+            self.assertEqual(proc.wait(), 124)
+            self.assertLess(time.time() - start, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import copy
+import json
+import sys
+import unittest
+
+sys.path.append("../../src/cbmc_starter_kit/template-for-repository/proofs/lib")
+import merge_runs # pylint: disable=wrong-import-position
+import summarize # pylint: disable=wrong-import-position
+
+
+def _shard(pipelines, status, start_time, end_time):
+    with open("../summarize_test/sample_run.json", encoding="utf-8") as handle:
+        run = json.load(handle)
+    template = run["pipelines"][0]
+    run["pipelines"] = []
+    for name, pipeline_status in pipelines:
+        pipeline = copy.deepcopy(template)
+        pipeline["name"] = name
+        pipeline["status"] = pipeline_status
+        run["pipelines"].append(pipeline)
+    run["status"] = status
+    run["start_time"] = start_time
+    run["end_time"] = end_time
+    return run
+
+
+class TestMergeRuns(unittest.TestCase):
+
+    def test_merge_runs(self):
+        merged = merge_runs.merge_runs([
+            _shard(
+                [("foo", "success"), ("print_tool_versions", "success")],
+                "success", "2022-05-24T02:00:00Z", "2022-05-24T03:00:00Z"),
+            _shard(
+                [("bar", "fail"), ("print_tool_versions", "success")],
+                "fail", "2022-05-24T02:10:00Z", "2022-05-24T03:30:05Z"),
+        ])
+        self.assertEqual(
+            [pipeline["name"] for pipeline in merged["pipelines"]],
+            ["foo", "print_tool_versions", "bar"])
+        self.assertEqual(merged["status"], "fail")
+        self.assertEqual(merged["start_time"], "2022-05-24T02:00:00Z")
+        self.assertEqual(merged["end_time"], "2022-05-24T03:30:05Z")
+        self.assertEqual(merged["__duration_str"], "1h 30m 05s")
+        self.assertEqual(merged["parallelism"]["n_proc"], 24)
+
+        status_table, proof_table = \
+            summarize._get_status_and_proof_summaries(merged) # pylint: disable=protected-access
+        self.assertEqual(status_table, [
+            ["Status", "Count"], ["Success", "1"], ["Fail", "1"]])
+        self.assertEqual(proof_table, [
+            ["Proof", "Status"], ["foo", "Success"], ["bar", "Fail"]])
+
+    def test_merge_successful_runs(self):
+        merged = merge_runs.merge_runs([
+            _shard([("foo", "success")], "success",
+                   "2022-05-24T02:00:00Z", "2022-05-24T02:00:30Z"),
+            _shard([("bar", "success")], "success",
+                   "2022-05-24T02:00:00Z", "2022-05-24T02:00:09Z"),
+        ])
+        self.assertEqual(merged["status"], "success")
+        self.assertEqual(merged["__duration_str"], "30s")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import json
+import pathlib
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+sys.path.append("../../src/cbmc_starter_kit/template-for-repository/proofs/lib")
+import portfolio # pylint: disable=wrong-import-position
+
+
+# A fake CBMC that takes as many seconds to finish as the number in the
+# name of its SAT solver, and logs the solver it ran with
+FAKE_CBMC = """\
+    #!/bin/sh
+    solver=default0
+    while [ $# -gt 0 ]; do
+      if [ "$1" = --external-sat-solver ]; then solver=$2; shift; fi
+      shift
+    done
+    echo "$solver" >> "$(dirname "$0")/log"
+    sleep "$(echo "$solver" | tr -d a-z)"
+    echo "result from $solver"
+    exit 10
+"""
+
+
+class TestPortfolio(unittest.TestCase):
+
+    def test_solver_command(self):
+        self.assertEqual(
+            portfolio.solver_command(
+                ["cbmc", "--external-sat-solver", "kissat", "x.goto"],
+                "default"),
+            ["cbmc", "x.goto"])
+        self.assertEqual(
+            portfolio.solver_command(["cbmc", "x.goto"], "cadical"),
+            ["cbmc", "--external-sat-solver", "cadical", "x.goto"])
+
+    def test_race(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = pathlib.Path(tmp)
+            cbmc = tmp / "cbmc"
+            cbmc.write_text(textwrap.dedent(FAKE_CBMC))
+            cbmc.chmod(0o755)
+            record = tmp / "record.json"
+
+            def run():
+                proc = subprocess.run([
+                    sys.executable, portfolio.__file__, "run",
+                    "--solvers", "slow3", "fast0", "--record", str(record),
+                    "--proof", "proof", "--race-every", "3",
+                    "--", str(cbmc), "--external-sat-solver", "x", "x.goto",
+                ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                    universal_newlines=True, check=False)
+                self.assertEqual(proc.returncode, 10)
+                return proc.stdout
+
+            self.assertEqual(run(), "result from fast0\n")
+            self.assertEqual(
+                json.loads(record.read_text()),
+                {"proof": {"solver": "fast0", "runs": 1}})
+            self.assertEqual(run(), "result from fast0\n")
+            self.assertEqual(run(), "result from fast0\n")
+            run()
+
+            # The first and fourth runs race both solvers
+            self.assertEqual(
+                sorted((tmp / "log").read_text().split()),
+                sorted(["slow3", "fast0", "fast0", "fast0", "slow3", "fast0"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
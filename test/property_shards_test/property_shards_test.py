@@ -0,0 +1,115 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import pathlib
+import subprocess
+import sys
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+sys.path.append("../../src/cbmc_starter_kit/template-for-repository/proofs/lib")
+import property_shards # pylint: disable=wrong-import-position
+
+
+def _result(*statuses):
+    failed = [status for status in statuses if status[1] == "FAILURE"]
+    return ET.fromstring(
+        "<cprover><program>CBMC 5.95.1</program>"
+        '<message type="STATUS-MESSAGE"><text>Generating GOTO Program</text></message>'
+        '<message type="WARNING"><text>no body for function stub</text></message>' +
+        "".join(
+            f'<result property="{name}" status="{status}"/>'
+            for name, status in statuses) +
+        f'<message type="STATUS-MESSAGE"><text>** {len(failed)} of '
+        f'{len(statuses)} failed (2 iterations)</text></message>'
+        '<message type="STATUS-MESSAGE"><text>VERIFICATION '
+        f'{"FAILED" if failed else "SUCCESSFUL"}</text></message>'
+        f'<cprover-status>{"FAILURE" if failed else "SUCCESS"}</cprover-status>'
+        "</cprover>")
+
+
+class TestPropertyShards(unittest.TestCase):
+
+    def test_shard_properties(self):
+        names = ["a.1", "a.2", "a.3", "b.1", "b.2"]
+        shards = [
+            property_shards.shard_properties(names, index, 3)
+            for index in range(1, 4)]
+        self.assertEqual(shards, [["a.1", "b.1"], ["a.2", "b.2"], ["a.3"]])
+        self.assertEqual(property_shards.shard_properties(names, 7, 8), [])
+
+    def test_merge_results(self):
+        root = property_shards.merge_results([
+            _result(("a.1", "SUCCESS"), ("b.1", "SUCCESS")),
+            _result(("a.2", "FAILURE")),
+            _result(),
+        ])
+        self.assertEqual(
+            [(result.get("property"), result.get("status"))
+             for result in root.iter("result")],
+            [("a.1", "SUCCESS"), ("b.1", "SUCCESS"), ("a.2", "FAILURE")])
+        self.assertEqual(
+            [message.findtext("text") for message in root.iter("message")], [
+                "Generating GOTO Program",
+                "no body for function stub",
+                "** 1 of 3 failed",
+                "VERIFICATION FAILED",
+            ])
+        self.assertEqual(root.findtext("program"), "CBMC 5.95.1")
+        self.assertEqual(root.findtext("cprover-status"), "FAILURE")
+
+    def test_merge_properties_checked_by_every_shard(self):
+        root = property_shards.merge_results([
+            _result(("a.1", "SUCCESS"), ("x.unwind.0", "SUCCESS")),
+            _result(("a.2", "SUCCESS"), ("x.unwind.0", "FAILURE")),
+            _result(("a.3", "SUCCESS"), ("x.unwind.0", "SUCCESS")),
+        ])
+        self.assertEqual(
+            [(result.get("property"), result.get("status"))
+             for result in root.iter("result")], [
+                 ("a.1", "SUCCESS"), ("x.unwind.0", "FAILURE"),
+                 ("a.2", "SUCCESS"), ("a.3", "SUCCESS")])
+        self.assertIn(
+            "** 1 of 4 failed",
+            [message.findtext("text") for message in root.iter("message")])
+
+    def test_merge_successful_results(self):
+        root = property_shards.merge_results([
+            _result(("a.1", "SUCCESS")), _result(("a.2", "SUCCESS"))])
+        self.assertEqual(root.findtext("cprover-status"), "SUCCESS")
+
+    def _merge(self, *results):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = []
+            for idx, result in enumerate(results):
+                files.append(pathlib.Path(tmp) / f"result-shard-{idx}.xml")
+                files[-1].write_bytes(ET.tostring(result))
+            return subprocess.run(
+                [sys.executable, property_shards.__file__, "merge", *files],
+                stdout=subprocess.PIPE, check=False).returncode
+
+    def test_merge_returns_like_cbmc(self):
+        self.assertEqual(
+            self._merge(_result(("a.1", "SUCCESS")), _result(("a.2", "SUCCESS"))),
+            0)
+        self.assertEqual(
+            self._merge(_result(("a.1", "SUCCESS")), _result(("a.2", "FAILURE"))),
+            10)
+
+    def test_add_traces(self):
+        root = _result(("a.1", "FAILURE"), ("a.2", "SUCCESS"), ("a.3", "FAILURE"))
+        self.assertEqual(property_shards.failed_properties(root), ["a.1", "a.3"])
+        traced = ET.fromstring(
+            '<result property="a.3" status="FAILURE"><goto_trace/></result>')
+        root = property_shards.add_traces(root, {"a.3": traced})
+        self.assertEqual(
+            [(result.get("property"), result.find("goto_trace") is not None)
+             for result in root.iter("result")],
+            [("a.1", False), ("a.2", False), ("a.3", True)])
+        self.assertEqual(root.findtext("cprover-status"), "FAILURE")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import pathlib
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.append("../../src/cbmc_starter_kit/template-for-repository/proofs/lib")
+import report_policy # pylint: disable=wrong-import-position
+
+
+def _result(status):
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<cprover><cprover-status>{status}</cprover-status></cprover>\n')
+
+
+class TestReportPolicy(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmp.name)
+        self.reportdir = self.root / "report"
+        self.result = self.root / "result.xml"
+        self.coverage = self.root / "coverage.xml"
+        self.runs = self.root / "runs.txt"
+        self.result.write_text(_result("FAILURE"))
+        self.coverage.write_text("<cprover/>\n")
+
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+    def render(self, *flags):
+        # The viewer writes an index page and counts its runs
+        command = (
+            'echo run >> "$0"; mkdir -p "$1/html"; '
+            'echo report > "$1/html/index.html"')
+        subprocess.run([
+            sys.executable, report_policy.__file__, *flags,
+            "--reportdir", str(self.reportdir),
+            "--result", str(self.result),
+            "--inputs", str(self.result), str(self.coverage),
+            "--", "sh", "-c", command, str(self.runs), str(self.reportdir),
+        ], stdout=subprocess.DEVNULL, check=True)
+
+
+    def count_runs(self):
+        return len(self.runs.read_text().splitlines())
+
+
+    def index_page(self):
+        return (self.reportdir / "html" / "index.html").read_text()
+
+
+    def test_unchanged_report_is_kept(self):
+        self.render("--changed")
+        self.render("--changed")
+        self.assertEqual(self.count_runs(), 1)
+        self.assertEqual(self.index_page(), "report\n")
+
+
+    def test_changed_input_renders_report(self):
+        self.render("--changed")
+        self.coverage.write_text("<cprover></cprover>\n")
+        self.render("--changed")
+        self.assertEqual(self.count_runs(), 2)
+
+
+    def test_passing_proof_gets_stub(self):
+        self.result.write_text(_result("SUCCESS"))
+        self.render("--failing")
+        self.assertFalse(self.runs.exists())
+        self.assertIn("No property of this proof failed", self.index_page())
+
+        self.result.write_text(_result("FAILURE"))
+        self.render("--failing", "--changed")
+        self.assertEqual(self.count_runs(), 1)
+        self.assertEqual(self.index_page(), "report\n")
+
+
+    def test_proof_failed(self):
+        self.assertTrue(report_policy.proof_failed(self.result))
+        self.result.write_text(_result("SUCCESS"))
+        self.assertFalse(report_policy.proof_failed(self.result))
+        self.assertTrue(report_policy.proof_failed(self.root / "missing.xml"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import pathlib
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+sys.path.append("../../src/cbmc_starter_kit/template-for-repository/proofs/lib")
+import result_text # pylint: disable=wrong-import-position
+
+
+RESULT = """<?xml version="1.0" encoding="UTF-8"?>
+<cprover>
+<program>CBMC 5.95.1 (cbmc-5.95.1)</program>
+<message type="STATUS-MESSAGE"><text>Generating GOTO Program</text></message>
+<message type="WARNING"><text>no body for function stub</text></message>
+<result property="harness.assertion.1" status="FAILURE">
+<goto_trace>
+<assignment hidden="false" step_nr="12" thread="0">
+<location file="foo.c" function="harness" line="3"/>
+<full_lhs>x</full_lhs><full_lhs_value>5</full_lhs_value>
+</assignment>
+<assignment hidden="true" step_nr="13" thread="0">
+<full_lhs>tmp</full_lhs><full_lhs_value>0</full_lhs_value>
+</assignment>
+<failure hidden="false" property="harness.assertion.1" reason="x == 0" step_nr="14" thread="0">
+<location file="foo.c" function="harness" line="5"/>
+</failure>
+</goto_trace>
+</result>
+<result property="harness.assertion.2" status="SUCCESS"/>
+<message type="STATUS-MESSAGE"><text>** 1 of 2 failed (2 iterations)</text></message>
+<message type="STATUS-MESSAGE"><text>VERIFICATION FAILED</text></message>
+<cprover-status>FAILURE</cprover-status>
+</cprover>
+"""
+
+PROPERTIES = """<?xml version="1.0" encoding="UTF-8"?>
+<cprover>
+<property class="assertion" name="harness.assertion.1">
+<location file="foo.c" function="harness" line="5"/>
+<description>assertion x == 0</description>
+</property>
+<property class="assertion" name="harness.assertion.2">
+<location file="foo.c" function="harness" line="6"/>
+<description>assertion y == 0</description>
+</property>
+</cprover>
+"""
+
+# A program with a failed property, for comparing with cbmc --trace
+PROGRAM = """
+int main(void) {
+  int x = 5;
+  int y;
+  y = x + 1;
+  __CPROVER_assert(y == 0, "y is zero");
+  return 0;
+}
+"""
+
+_HAVE_CBMC = shutil.which("cbmc") is not None
+
+
+def _results_and_traces(lines):
+    """The lines from '** Results:' on, as the summary renders them.
+
+    The binary values of assignments and the expression of each violated
+    property are dropped, as are blank lines.
+    """
+
+    lines = lines[lines.index("** Results:"):]
+    summary = []
+    for number, line in enumerate(lines):
+        if number >= 3 and lines[number - 3] == "Violated property:":
+            continue
+        line = re.sub(r" \([01 ]+\)$", "", line)
+        if line.strip():
+            summary.append(line)
+    return summary
+
+
+class TestResultText(unittest.TestCase):
+
+    def test_render(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            property_file = pathlib.Path(tmp) / "property.xml"
+            property_file.write_text(PROPERTIES)
+            properties = result_text.load_properties(property_file)
+        lines = result_text.render(ET.fromstring(RESULT), properties)
+        self.assertEqual(lines, [
+            "CBMC 5.95.1 (cbmc-5.95.1)",
+            "Generating GOTO Program",
+            "**** WARNING: no body for function stub",
+            "",
+            "** Results:",
+            "foo.c function harness",
+            "[harness.assertion.1] line 5 assertion x == 0: FAILURE",
+            "[harness.assertion.2] line 6 assertion y == 0: SUCCESS",
+            "",
+            "Trace for harness.assertion.1:",
+            "",
+            "State 12 file foo.c function harness line 3 thread 0",
+            "----------------------------------------------------",
+            "  x=5",
+            "",
+            "Violated property:",
+            "  file foo.c function harness line 5 thread 0",
+            "  x == 0",
+            "",
+            "** 1 of 2 failed (2 iterations)",
+            "VERIFICATION FAILED",
+        ])
+
+    def test_render_steps_under_one_state(self):
+        trace = ET.fromstring(
+            '<goto_trace>'
+            '<assignment hidden="false" step_nr="7" thread="0">'
+            '<location file="foo.c" function="harness" line="2"/>'
+            '<full_lhs>s.a</full_lhs><full_lhs_value>1</full_lhs_value>'
+            '</assignment>'
+            '<assignment hidden="false" step_nr="7" thread="0">'
+            '<location file="foo.c" function="harness" line="2"/>'
+            '<full_lhs>s.b</full_lhs><full_lhs_value>2</full_lhs_value>'
+            '</assignment>'
+            '<function_call hidden="false" step_nr="8" thread="0"/>'
+            '</goto_trace>')
+        self.assertEqual(result_text.render_trace("p", trace), [
+            "", "Trace for p:",
+            "", "State 7 file foo.c function harness line 2 thread 0",
+            "-" * 52, "  s.a=1", "  s.b=2",
+            ""])
+
+    @unittest.skipUnless(_HAVE_CBMC, "cbmc is not installed")
+    def test_render_like_cbmc(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = pathlib.Path(tmp) / "main.c"
+            source.write_text(PROGRAM)
+
+            def cbmc(*flags):
+                return subprocess.run(
+                    ["cbmc", *flags, str(source)], stdout=subprocess.PIPE,
+                    universal_newlines=True, check=False).stdout
+
+            property_file = pathlib.Path(tmp) / "property.xml"
+            property_file.write_text(cbmc("--show-properties", "--xml-ui"))
+            lines = result_text.render(
+                ET.fromstring(cbmc("--trace", "--xml-ui")),
+                result_text.load_properties(property_file))
+            self.assertEqual(
+                _results_and_traces(lines),
+                _results_and_traces(cbmc("--trace").splitlines()))
+
+    def test_render_without_properties(self):
+        lines = result_text.render(ET.fromstring(RESULT), {})
+        self.assertIn("[harness.assertion.2]: SUCCESS", lines)
+
+    def test_return_code(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            result = pathlib.Path(tmp) / "result.xml"
+            result.write_text(RESULT)
+            proc = subprocess.run(
+                [sys.executable, result_text.__file__, str(result)],
+                stdout=subprocess.PIPE, text=True, check=False)
+            self.assertEqual(proc.returncode, 10)
+            self.assertTrue(proc.stdout.endswith("VERIFICATION FAILED\n"))
+
+            result.write_text(RESULT.replace("FAILURE", "SUCCESS"))
+            proc = subprocess.run(
+                [sys.executable, result_text.__file__, str(result)],
+                stdout=subprocess.DEVNULL, check=False)
+            self.assertEqual(proc.returncode, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+SCRIPT = pathlib.Path(
+    "../../src/cbmc_starter_kit/template-for-repository/proofs/run-cbmc-proofs.py"
+).resolve()
+
+# Generous enough for a slow CI machine, but far below the cost of even one
+# make invocation on a real proof tree
+MAX_STARTUP_SECONDS = 1.0
+
+RUNS = 5
+
+
+class TestStartup(unittest.TestCase):
+    """Guard the startup latency of run-cbmc-proofs.py.
+
+    The script is run with make and litani replaced by commands that
+    record that they were run, so that the test fails if merely printing
+    the help message or the version runs either of them.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.tmp.name)
+        self.bin_dir = root / "bin"
+        self.bin_dir.mkdir()
+        self.calls = root / "calls"
+        for tool in ["make", "litani"]:
+            path = self.bin_dir / tool
+            path.write_text(f"#!/bin/sh\necho {tool} >> {self.calls}\nexit 1\n")
+            path.chmod(0o755)
+        self.proof_root = root / "proofs"
+        self.proof_root.mkdir()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_script(self, *args):
+        env = dict(os.environ)
+        env["PATH"] = f"{self.bin_dir}{os.pathsep}{env['PATH']}"
+        start = time.monotonic()
+        proc = subprocess.run(
+            [sys.executable, str(SCRIPT), *args], cwd=self.proof_root, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            universal_newlines=True, check=False)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        return time.monotonic() - start
+
+    def test_help(self):
+        latency = statistics.median(self.run_script("--help") for _ in range(RUNS))
+        self.assertFalse(self.calls.exists(), "--help ran make or litani")
+        self.assertLess(latency, MAX_STARTUP_SECONDS)
+
+    def test_version(self):
+        latency = statistics.median(
+            self.run_script("--version") for _ in range(RUNS))
+        self.assertFalse(self.calls.exists(), "--version ran make or litani")
+        self.assertLess(latency, MAX_STARTUP_SECONDS)
+
+
+if __name__ == '__main__':
+    unittest.main()
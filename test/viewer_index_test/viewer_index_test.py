@@ -0,0 +1,134 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+
+import importlib.util
+import json
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.append("../../src/cbmc_starter_kit/template-for-repository/proofs/lib")
+import viewer_index # pylint: disable=wrong-import-position
+
+# The example VIEWER_EXCLUDE in Makefile.common
+_EXCLUDE = r"(.*/)?(\.git|gotos)/"
+
+_HAVE_VIEWER = importlib.util.find_spec("cbmc_viewer") is not None
+
+
+def _write_tree(root, paths):
+    for path in paths:
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text("")
+
+
+class TestViewerIndex(unittest.TestCase):
+
+    def test_source_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = pathlib.Path(tmp)
+            _write_tree(root, [
+                "src/foo.c", "src/foo.o", "include/foo.H",
+                "lib/bar.inl", "build/gen.c", "README.md"])
+
+            self.assertEqual(viewer_index.source_files(root), [
+                "build/gen.c", "include/foo.H", "lib/bar.inl", "src/foo.c"])
+            self.assertEqual(
+                viewer_index.source_files(root, exclude="build/"),
+                ["include/foo.H", "lib/bar.inl", "src/foo.c"])
+
+    def test_exclude_directories(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = pathlib.Path(tmp)
+            _write_tree(root, [
+                "src/foo.c", ".git/foo.c", "src/.cache/foo.h",
+                "proofs/foo/foo_harness.c", "proofs/foo/gotos/foo.c",
+                "proofs/output/foo.c", "output/foo.c"])
+
+            self.assertEqual(
+                viewer_index.source_files(root, exclude=_EXCLUDE), [
+                    "output/foo.c", "proofs/foo/foo_harness.c",
+                    "proofs/output/foo.c", "src/.cache/foo.h", "src/foo.c"])
+
+    @unittest.skipUnless(_HAVE_VIEWER, "cbmc-viewer is not installed")
+    def test_source_files_match_cbmc_viewer(self):
+        # pylint: disable=import-outside-toplevel
+        from cbmc_viewer import sourcet
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = pathlib.Path(tmp).resolve()
+            _write_tree(root, [
+                "src/foo.c", "src/foo.o", ".git/foo.c", "lib/bar.inl",
+                "proofs/foo/gotos/foo.c", "proofs/output/foo.c"])
+
+            for exclude in [None, _EXCLUDE]:
+                self.assertEqual(
+                    viewer_index.source_files(root, exclude=exclude),
+                    sourcet.SourceFromFind(
+                        str(root), exclude, r"^\.(c|h|inl)$").files)
+
+    def test_viewer_symbol(self):
+        root = pathlib.Path("/src")
+        tags = [
+            {"symbol": "foo", "file": root / "b.c", "line": 3, "kind": "function"},
+            {"symbol": "foo", "file": root / "a.c", "line": 9, "kind": "function"},
+            {"symbol": "N", "file": root / "inc/a.h", "line": 1, "kind": "macro"},
+        ]
+        self.assertEqual(viewer_index.viewer_symbol(root, tags), {
+            "viewer-symbol": {
+                "N": {"file": "inc/a.h", "function": None, "line": 1},
+                "foo": {"file": "a.c", "function": None, "line": 9},
+            }
+        })
+
+    def _write_index(self, tmp):
+        root = pathlib.Path(tmp).resolve()
+        files = ["a.c", "inc/a.h"]
+        tags = [
+            {"symbol": "foo", "file": root / "a.c", "line": 9, "kind": "function"},
+            {"symbol": "N", "file": root / "inc/a.h", "line": 1, "kind": "macro"},
+        ]
+        source = root / "viewer-source.json"
+        symbol = root / "viewer-symbol.json"
+        viewer_index.write_json(source, viewer_index.viewer_source(root, files))
+        viewer_index.write_json(symbol, viewer_index.viewer_symbol(root, tags))
+        return root, source, symbol
+
+    def test_index_schema(self):
+        # The schema of viewer-source.json and viewer-symbol.json that
+        # cbmc-viewer 3 reads with --viewer-source and --viewer-symbol
+        with tempfile.TemporaryDirectory() as tmp:
+            root, source, symbol = self._write_index(tmp)
+            with open(source, encoding="utf-8") as handle:
+                self.assertEqual(json.load(handle), {"viewer-source": {
+                    "root": str(root),
+                    "files": ["a.c", "inc/a.h"],
+                    "all_files": [str(root / "a.c"), str(root / "inc/a.h")],
+                }})
+            with open(symbol, encoding="utf-8") as handle:
+                self.assertEqual(json.load(handle), {"viewer-symbol": {
+                    "N": {"file": "inc/a.h", "function": None, "line": 1},
+                    "foo": {"file": "a.c", "function": None, "line": 9},
+                }})
+
+    @unittest.skipUnless(_HAVE_VIEWER, "cbmc-viewer is not installed")
+    def test_index_loads_in_cbmc_viewer(self):
+        # pylint: disable=import-outside-toplevel
+        from cbmc_viewer import sourcet, symbolt
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root, source, symbol = self._write_index(tmp)
+            sources = sourcet.SourceFromJson([str(source)])
+            self.assertEqual(sources.root, str(root))
+            self.assertEqual(sources.files, ["a.c", "inc/a.h"])
+            symbols = symbolt.SymbolFromJson([str(symbol)])
+            symbols.validate()
+            self.assertEqual(
+                symbols.lookup("foo"),
+                {"file": "a.c", "function": None, "line": 9})
+
+
+if __name__ == '__main__':
+    unittest.main()